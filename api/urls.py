@@ -2,7 +2,8 @@ from django.conf.urls import include, url
 from rest_framework import routers
 
 from reservations.views import (
-    CustomerViewSet, DestinationViewSet, ReservationViewSet, RoomViewSet
+    ArchivedReservationViewSet, CustomerViewSet, DestinationViewSet,
+    ReservationViewSet, RoomViewSet
 )
 
 router = routers.DefaultRouter()
@@ -10,6 +11,7 @@ router.register('customers', CustomerViewSet)
 router.register('destinations', DestinationViewSet)
 router.register('reservations', ReservationViewSet)
 router.register('rooms', RoomViewSet)
+router.register('archived-reservations', ArchivedReservationViewSet)
 
 urlpatterns = [
     url(r'^', include(router.urls))
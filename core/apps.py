@@ -2,7 +2,28 @@
 from __future__ import unicode_literals
 
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.authtoken.models import Token
+
+        from core.authentication import token_deleted, user_changed
+        from core.db import check_connections
+        from core.metrics import instrument_connection
+        connection_created.connect(instrument_connection)
+
+        # Drop cached tokens of deleted tokens and changed users (deleting a
+        # user deletes its token too)
+        post_delete.connect(token_deleted, sender=Token, dispatch_uid='token_deleted')
+        post_save.connect(user_changed, sender=get_user_model(), dispatch_uid='token_user_changed')
+
+        if settings.CONN_HEALTH_CHECKS:
+            request_started.connect(check_connections)
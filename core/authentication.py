@@ -0,0 +1,75 @@
+'''
+Token authentication without a database query per request
+
+DRF's `TokenAuthentication` looks the token and its user up on every
+request. `CachedTokenAuthentication` keeps them in the `tokens` cache for
+`TOKEN_CACHE_TIMEOUT` seconds, shared by all worker processes, so repeat
+requests with the same token don't touch the database. Entries are
+dropped when the token is deleted or its user is saved (e.g. deactivated)
+or deleted, so those take effect on the next request.
+
+Only the field values of the token and user are cached, without the
+user's password hash, and the instances are rebuilt from them with the
+password deferred (so saving the user doesn't overwrite it). A user's
+groups and permissions aren't cached either; they are queried as usual
+when checked, so changing them needs no invalidation.
+'''
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def get_cache():
+    return caches['tokens']
+
+
+def get_cache_key(key):
+    # Don't keep the tokens themselves in the cache
+    return 'token:{}'.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def dump_instance(instance, exclude=()):
+    '''
+    The database and field values of `instance`, to rebuild it with `load_instance`
+    '''
+    fields = [field for field in instance._meta.concrete_fields if field.attname not in exclude]
+    return instance._state.db, [(field.attname, getattr(instance, field.attname)) for field in fields]
+
+
+def load_instance(model, data):
+    '''
+    Instance of `model` from `dump_instance` data, with missing fields deferred
+    '''
+    db, values = data
+    return model.from_db(db, [name for name, _ in values], [value for _, value in values])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = get_cache_key(key)
+        cached = get_cache().get(cache_key)
+        if cached is not None:
+            user_data, token_data = cached
+            user = load_instance(get_user_model(), user_data)
+            token = load_instance(self.get_model(), token_data)
+            token.user = user
+            return user, token
+
+        # Invalid tokens and inactive users raise, so only valid ones are cached
+        user, token = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+        cached = (dump_instance(user, exclude=['password']), dump_instance(token))
+        get_cache().set(cache_key, cached, settings.TOKEN_CACHE_TIMEOUT)
+        return user, token
+
+
+def token_deleted(sender, instance, **kwargs):
+    get_cache().delete(get_cache_key(instance.key))
+
+
+def user_changed(sender, instance, **kwargs):
+    keys = Token.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    get_cache().delete_many([get_cache_key(key) for key in keys])
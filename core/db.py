@@ -0,0 +1,60 @@
+import threading
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def check_connections(**kwargs):
+    '''
+    Close persistent connections that stopped working while idle
+
+    Django only discards a persistent connection after a query on it has
+    failed, so a connection the database dropped between requests (e.g.
+    on restart or an idle timeout) would fail the next request's first
+    query. Connected to `request_started` when `CONN_HEALTH_CHECKS` is on;
+    costs one round trip per open connection and request.
+    '''
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def use_replica(alias):
+    '''
+    Send reads on this thread to the replica `alias` (or the primary, if
+    `None`) until changed
+    '''
+    _state.replica = alias
+
+
+def get_replica():
+    '''
+    The replica this thread's reads go to, or `None` for the primary
+    '''
+    return getattr(_state, 'replica', None)
+
+
+class ReplicaRouter(object):
+    '''
+    Send reads to a read replica when the current request allows it, and
+    everything else to the primary (`default`) database
+
+    Reads only go to a replica while `use_replica` has selected one, which
+    `ReplicaMiddleware` does for requests that don't need up-to-date data.
+    Everything else (writes, management commands, requests following a
+    write) uses the primary.
+    '''
+    def db_for_read(self, model, **hints):
+        return get_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica are saved to the primary as well
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS}.union(settings.DATABASE_REPLICAS)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,381 @@
+'''
+Request metrics in the Prometheus text format
+
+Each process accumulates its samples in its own memory-mapped file in
+`settings.METRICS_DIR`, so updates need no cross-process locking and cost
+about as much as a dict lookup. A scrape reads and sums the files of every
+process. The files of processes that have exited (e.g. workers recycled by
+uWSGI) are merged into a single aggregate file and removed, so counters
+never go backwards and the directory doesn't keep growing. The directory
+should be emptied when the server is restarted.
+'''
+import bisect
+import fcntl
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db.backends.utils import CursorDebugWrapper, CursorWrapper
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+METRICS = OrderedDict([
+    ('reserver_http_request_duration_seconds', ('histogram', 'Request latency by route and method.')),
+    ('reserver_http_responses_total', ('counter', 'Responses by route, method and status code.')),
+    ('reserver_db_queries_total', ('counter', 'Database queries by route and method.')),
+    ('reserver_db_query_duration_seconds_total', ('counter', 'Time spent on database queries by route and method.')),
+    ('reserver_serializer_duration_seconds_total', ('counter', 'Time spent serializing by route and method.')),
+    ('reserver_throttled_requests_total', ('counter', 'Requests rejected by a throttle, by route, method and scope.')),
+])
+
+AGGREGATE_FILE = 'metrics-aggregate.db'
+PROCESS_FILE = re.compile(r'^metrics-(\d+)\.db$')
+
+_local = threading.local()
+
+
+class MmapedDict(object):
+    '''
+    Float values keyed by string, stored in a memory-mapped file
+
+    The file starts with the number of bytes in use, followed by entries
+    of a 4-byte key length, the UTF-8 key padded so the value is 8-byte
+    aligned, and the value as a double. Only the owning process writes
+    to the file.
+    '''
+    initial_size = 64 * 1024
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        if self._capacity == 0:
+            self._capacity = self.initial_size
+            self._file.truncate(self._capacity)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+        self._used = struct.unpack_from('q', self._map, 0)[0] or 8
+        self._positions = {key: position for key, _, position in read_entries(self._map, self._used)}
+
+    def _add_key(self, key):
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (8 - (len(encoded) + 4) % 8)
+        entry = struct.pack('i', len(padded)) + padded + struct.pack('d', 0.0)
+
+        if self._used + len(entry) > self._capacity:
+            while self._used + len(entry) > self._capacity:
+                self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+        # Write the entry before publishing it in the header
+        self._map[self._used:self._used + len(entry)] = entry
+        self._positions[key] = self._used + len(entry) - 8
+        self._used += len(entry)
+        struct.pack_into('q', self._map, 0, self._used)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def inc(self, key, amount):
+        if key not in self._positions:
+            self._add_key(key)
+        position = self._positions[key]
+        value = struct.unpack_from('d', self._map, position)[0]
+        struct.pack_into('d', self._map, position, value + amount)
+
+
+def read_entries(data, used):
+    '''
+    Yield `(key, value, value position)` for the entries of a metrics file
+    '''
+    position = 8
+    while position < used:
+        length = struct.unpack_from('i', data, position)[0]
+        key = bytes(data[position + 4:position + 4 + length]).decode('utf-8').rstrip(' ')
+        position += 4 + length
+        yield key, struct.unpack_from('d', data, position)[0], position
+        position += 8
+
+
+def read_file(path):
+    with open(path, 'rb') as metrics_file:
+        data = metrics_file.read()
+    if len(data) < 8:
+        return []
+    return [(key, value) for key, value, _ in read_entries(data, struct.unpack_from('q', data, 0)[0])]
+
+
+@contextmanager
+def directory_lock():
+    '''
+    Exclusive lock on the metrics directory, held while process files are
+    created or merged
+    '''
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_exited_processes():
+    '''
+    Add the files of processes that no longer exist to the aggregate file
+    and remove them (with the directory locked)
+    '''
+    aggregate = None
+    for filename in os.listdir(settings.METRICS_DIR):
+        match = PROCESS_FILE.match(filename)
+        if match is None or process_exists(int(match.group(1))):
+            continue
+
+        path = os.path.join(settings.METRICS_DIR, filename)
+        if aggregate is None:
+            aggregate = MmapedDict(os.path.join(settings.METRICS_DIR, AGGREGATE_FILE))
+        for key, value in read_file(path):
+            aggregate.inc(key, value)
+        os.remove(path)
+
+    if aggregate is not None:
+        aggregate.close()
+
+
+class ProcessStore(object):
+    '''
+    The current process's metrics file, reopened after a fork
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owner = None
+        self._values = None
+        self._keys = {}
+
+    def _get_values(self):
+        owner = (os.getpid(), settings.METRICS_DIR)
+        if self._owner != owner:
+            if self._values is not None:
+                self._values.close()
+            path = os.path.join(settings.METRICS_DIR, 'metrics-{}.db'.format(owner[0]))
+            # Locked so a file left by an earlier process with the same id
+            # isn't merged away while it is reopened
+            with directory_lock():
+                self._values = MmapedDict(path)
+            self._owner = owner
+        return self._values
+
+    def _key(self, name, labels):
+        try:
+            return self._keys[name, labels]
+        except KeyError:
+            key = self._keys[name, labels] = json.dumps([name, labels])
+            return key
+
+    def inc(self, samples):
+        '''
+        Add to several `(name, labels, amount)` samples at once
+        '''
+        with self._lock:
+            values = self._get_values()
+            for name, labels, amount in samples:
+                values.inc(self._key(name, labels), amount)
+
+
+store = ProcessStore()
+
+
+class RequestStats(object):
+    '''
+    Database and serializer time for the request handled by this thread
+    '''
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.throttled = []
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request():
+    _local.stats = None
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+def record_request(route, method, status_code, duration, stats):
+    labels = (('method', method), ('route', route))
+    bucket = DURATION_BUCKETS[bisect.bisect_left(DURATION_BUCKETS, duration)]
+    samples = [
+        ('reserver_http_request_duration_seconds_bucket', labels + (('le', format_value(bucket)),), 1),
+        ('reserver_http_request_duration_seconds_sum', labels, duration),
+        ('reserver_http_request_duration_seconds_count', labels, 1),
+        ('reserver_http_responses_total', labels + (('status', str(status_code)),), 1),
+        ('reserver_db_queries_total', labels, stats.queries),
+        ('reserver_db_query_duration_seconds_total', labels, stats.query_time),
+        ('reserver_serializer_duration_seconds_total', labels, stats.serializer_time),
+    ]
+    samples.extend(
+        ('reserver_throttled_requests_total', labels + (('scope', scope),), 1)
+        for scope in stats.throttled
+    )
+    store.inc(samples)
+
+
+def record_throttle(scope):
+    stats = current_stats()
+    if stats is not None:
+        stats.throttled.append(scope)
+
+
+def time_serialization(func, *args):
+    '''
+    Call `func`, adding its duration to the current request's serializer
+    time unless an outer serializer is already being timed
+    '''
+    stats = current_stats()
+    if stats is None or stats.serializing:
+        return func(*args)
+
+    stats.serializing = True
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        stats.serializer_time += time.perf_counter() - start
+        stats.serializing = False
+
+
+class TimedCursorMixin(object):
+    def _timed(self, method, *args):
+        stats = current_stats()
+        if stats is None:
+            return method(*args)
+
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            stats.queries += 1
+            stats.query_time += time.perf_counter() - start
+
+    def execute(self, sql, params=None):
+        return self._timed(super(TimedCursorMixin, self).execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self._timed(super(TimedCursorMixin, self).executemany, sql, param_list)
+
+
+class TimedCursorWrapper(TimedCursorMixin, CursorWrapper):
+    pass
+
+
+class TimedCursorDebugWrapper(TimedCursorMixin, CursorDebugWrapper):
+    pass
+
+
+def instrument_connection(sender, connection, **kwargs):
+    '''
+    `connection_created` receiver making the connection's cursors count
+    and time queries
+    '''
+    if not getattr(connection, 'metrics_instrumented', False):
+        connection.make_cursor = partial(TimedCursorWrapper, db=connection)
+        connection.make_debug_cursor = partial(TimedCursorDebugWrapper, db=connection)
+        connection.metrics_instrumented = True
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def format_labels(labels):
+    return ','.join('{}="{}"'.format(
+        name, value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+    ) for name, value in labels)
+
+
+def collect():
+    '''
+    Samples summed over the metrics files of all processes, as a mapping
+    of `(name, labels)` to value
+    '''
+    totals = defaultdict(float)
+    if not os.path.isdir(settings.METRICS_DIR):
+        return totals
+
+    with directory_lock():
+        merge_exited_processes()
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith('.db'):
+                continue
+            for key, value in read_file(os.path.join(settings.METRICS_DIR, filename)):
+                name, labels = json.loads(key)
+                totals[name, tuple(tuple(label) for label in labels)] += value
+    return totals
+
+
+def histogram_lines(name, samples):
+    '''
+    Cumulative bucket, sum and count lines for each label set of a histogram
+    '''
+    counts = defaultdict(dict)
+    for (sample, labels), value in samples.items():
+        if sample == name + '_bucket':
+            counts[labels[:-1]][labels[-1][1]] = value
+
+    for labels in sorted(counts):
+        cumulative = 0
+        for bound in DURATION_BUCKETS:
+            le = format_value(bound)
+            cumulative += counts[labels].get(le, 0)
+            yield '{}_bucket{{{}}} {}'.format(name, format_labels(labels + (('le', le),)), format_value(cumulative))
+        for suffix in ('_sum', '_count'):
+            value = samples.get((name + suffix, labels), 0)
+            yield '{}{}{{{}}} {}'.format(name, suffix, format_labels(labels), format_value(value))
+
+
+def render():
+    '''
+    All metrics in the Prometheus text exposition format
+    '''
+    samples = collect()
+    lines = []
+    for name, (metric_type, description) in METRICS.items():
+        lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, metric_type))
+        if metric_type == 'histogram':
+            lines.extend(histogram_lines(name, samples))
+            continue
+        for sample, labels in sorted(key for key in samples if key[0] == name):
+            lines.append('{}{{{}}} {}'.format(name, format_labels(labels), format_value(samples[sample, labels])))
+    return '\n'.join(lines) + '\n'
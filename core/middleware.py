@@ -0,0 +1,113 @@
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import db, metrics
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class MetricsMiddleware(object):
+    '''
+    Record latency, query and serializer time for every request
+
+    Requests are labelled with the name of the URL pattern they matched
+    (e.g. `reservation-list`) rather than the path, to keep the number of
+    series bounded. Should be the first middleware so the timing covers
+    all the others.
+    '''
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        duration = time.perf_counter() - start
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.view_name if resolver_match else 'unmatched'
+        metrics.record_request(route, request.method, response.status_code, duration, stats)
+
+        return response
+
+
+class ReplicaMiddleware(object):
+    '''
+    Serve reads for safe requests from a replica database, with
+    read-your-writes for the client that made a change
+
+    After a write the client is pinned to the primary for
+    `REPLICA_PIN_SECONDS`, long enough for the replicas to catch up, so its
+    next requests see the change. Browsers are pinned with a cookie, and
+    API clients (which usually don't keep cookies) by their `Authorization`
+    header in the shared cache. Each request reads from a single replica so
+    its results are consistent, including streamed responses.
+    '''
+    cookie_name = 'use_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_pin_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return 'replica_pin:{}'.format(hashlib.sha256(authorization.encode('utf-8')).hexdigest())
+
+    def is_pinned(self, request):
+        key = self.get_pin_key(request)
+        if key is not None and cache.get(key):
+            return True
+
+        try:
+            return float(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def pin(self, request, response):
+        response.set_cookie(
+            self.cookie_name,
+            str(time.time() + settings.REPLICA_PIN_SECONDS),
+            max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True,
+        )
+
+        key = self.get_pin_key(request)
+        if key is not None and settings.DATABASE_REPLICAS:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+
+    def __call__(self, request):
+        write = request.method not in SAFE_METHODS
+        replica = None
+        if settings.DATABASE_REPLICAS and not write and not self.is_pinned(request):
+            replica = random.choice(settings.DATABASE_REPLICAS)
+            db.use_replica(replica)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            db.use_replica(None)
+
+        if write:
+            self.pin(request, response)
+        elif replica is not None and response.streaming:
+            # Streamed content is only read after this returns
+            response.streaming_content = stream_from(replica, response.streaming_content)
+
+        return response
+
+
+def stream_from(replica, content):
+    db.use_replica(replica)
+    try:
+        for chunk in content:
+            yield chunk
+    finally:
+        db.use_replica(None)
@@ -6,6 +6,8 @@ from django.views.generic.base import RedirectView
 from rest_framework.authtoken import views
 from rest_framework.documentation import include_docs_urls
 
+from core.views import metrics_view
+
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
 
@@ -13,6 +15,7 @@ urlpatterns = [
     url(r'^api/', include('api.urls')),
     url(r'^api-auth/', include('rest_framework.urls')),
     url(r'^api-token-auth/', views.obtain_auth_token),
+    url(r'^metrics$', metrics_view, name='metrics'),
     url(r'^$', RedirectView.as_view(pattern_name='api-root')),  # Forward to api-root
 
     # Auto-generated DRF docs
@@ -0,0 +1,10 @@
+from django.http import HttpResponse
+
+from core import metrics
+
+
+def metrics_view(request):
+    '''
+    Metrics for all worker processes, for Prometheus to scrape
+    '''
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,8 +1,18 @@
 from django.contrib import admin
 
-from reservations.models import Customer, Destination, Reservation, Room
+from reservations.models import (
+    ArchivedReservation, Customer, Destination, Reservation, Room
+)
 
-admin.site.register(Customer)
+
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ('last_name', 'first_name', 'email', 'phone')
+    # Prefix searches, which the customer search indexes can serve
+    search_fields = ('^last_name', '^first_name', '^email', '^phone')
+
+
+admin.site.register(Customer, CustomerAdmin)
+admin.site.register(ArchivedReservation)
 admin.site.register(Destination)
 admin.site.register(Reservation)
 admin.site.register(Room)
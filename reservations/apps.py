@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ReservationsConfig(AppConfig):
     name = 'reservations'
+
+    def ready(self):
+        from reservations.signals import connect_signals
+        connect_signals()
@@ -0,0 +1,60 @@
+'''
+Moving long-finished reservations out of the live reservation table
+
+Conflict checks, availability searches and reservation lists only ever
+need current and future stays, so keeping years of checked-out ones in the
+same table just makes them slower. `archive_reservations` moves them to
+`ArchivedReservation` in small batches, each in its own short transaction,
+so only the rows being moved are locked and other writes aren't held up.
+'''
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from reservations.models import ArchivedReservation, Reservation, Tombstone
+from reservations.versioning import collection_changed
+
+FIELDS = ('id', 'customer_id', 'room_id', 'start_date', 'end_date', 'updated_at')
+
+
+def archive_batch(cutoff, batch_size):
+    '''
+    Move up to `batch_size` reservations that ended before `cutoff` to the
+    archive, returning how many were moved
+    '''
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        rows = list(
+            Reservation.objects.using(DEFAULT_DB_ALIAS).select_for_update().filter(
+                end_date__lt=cutoff
+            ).order_by('end_date', 'start_date', 'id').values_list(*FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        ArchivedReservation.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            ArchivedReservation(**dict(zip(FIELDS, row))) for row in rows
+        )
+
+        # Nothing references reservations, so skip the delete collector (and
+        # its per-row signals), recording the tombstones and bumping the
+        # versions once for the batch
+        ids = [row[0] for row in rows]
+        Reservation.objects.using(DEFAULT_DB_ALIAS).filter(id__in=ids)._raw_delete(DEFAULT_DB_ALIAS)
+        Tombstone.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            Tombstone(model=Reservation._meta.label_lower, object_id=pk) for pk in ids
+        )
+        collection_changed(Reservation)
+        collection_changed(ArchivedReservation)
+
+    return len(rows)
+
+
+def archive_reservations(cutoff, batch_size):
+    '''
+    Move every reservation that ended before `cutoff` to the archive
+
+    Yields the number of reservations moved by each batch.
+    '''
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return
+        yield moved
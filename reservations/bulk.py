@@ -0,0 +1,183 @@
+import bisect
+from collections import defaultdict
+
+from django.db import connections
+from rest_framework import serializers
+
+from reservations import occupancy
+from reservations.models import Customer, Reservation, Room
+from reservations.serializers import (
+    BulkReservationSerializer, CONFLICT_MESSAGE, reservation_conflict_errors
+)
+from reservations.versioning import collection_changed
+
+DOES_NOT_EXIST_MESSAGE = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+
+# How many times a batch is checked and inserted before giving up if
+# concurrent requests keep creating conflicting reservations
+CONFLICT_ATTEMPTS = 3
+
+
+def find_conflicts(rows, existing):
+    '''
+    Overlap check for a batch of reservations
+
+    `rows` is a list of (index, room_id, start_date, end_date) tuples and
+    `existing` maps each room id to its current reservations as a list of
+    (start_date, end_date) tuples. Returns the indexes of rows that overlap
+    an existing reservation or an earlier row (by index) of the batch, so
+    the first of two overlapping rows wins.
+    '''
+    starts = {}
+    ends = {}
+    for room_id, ranges in existing.items():
+        ranges = sorted(ranges)
+        starts[room_id] = [start for start, _ in ranges]
+        ends[room_id] = [end for _, end in ranges]
+
+    conflicts = set()
+    for index, room_id, start, end in sorted(rows):
+        room_starts = starts.setdefault(room_id, [])
+        room_ends = ends.setdefault(room_id, [])
+
+        # Accepted ranges don't overlap each other, so the only one that can
+        # conflict is the last one starting on or before `end`
+        pos = bisect.bisect_right(room_starts, end)
+        if pos and room_ends[pos - 1] >= start:
+            conflicts.add(index)
+            continue
+
+        room_starts.insert(pos, start)
+        room_ends.insert(pos, end)
+
+    return conflicts
+
+
+def validate_related(valid, results):
+    '''
+    Check that every customer and room referenced by the batch exists
+    '''
+    customer_ids = set(Customer.objects.filter(
+        id__in={data['customer'] for data in valid.values()}
+    ).values_list('id', flat=True))
+    room_ids = set(Room.objects.filter(
+        id__in={data['room'] for data in valid.values()}
+    ).values_list('id', flat=True))
+
+    for index, data in list(valid.items()):
+        errors = {}
+        for field, ids in (('customer', customer_ids), ('room', room_ids)):
+            if data[field] not in ids:
+                errors[field] = [DOES_NOT_EXIST_MESSAGE.format(pk_value=data[field])]
+        if errors:
+            results[index] = {'errors': errors}
+            del valid[index]
+
+
+def validate_conflicts(valid, results):
+    '''
+    Check the batch for conflicts with existing reservations and itself
+    '''
+    # Fetch every reservation that could overlap a row in the batch
+    existing = defaultdict(list)
+    overlapping = Reservation.objects.filter(
+        room_id__in={data['room'] for data in valid.values()},
+        start_date__lte=max(data['end_date'] for data in valid.values()),
+        end_date__gte=min(data['start_date'] for data in valid.values()),
+    ).values_list('room_id', 'start_date', 'end_date')
+    for room_id, start, end in overlapping:
+        existing[room_id].append((start, end))
+
+    conflicts = find_conflicts([
+        (index, data['room'], data['start_date'], data['end_date'])
+        for index, data in valid.items()
+    ], existing)
+    for index in conflicts:
+        results[index] = {'errors': {'non_field_errors': [CONFLICT_MESSAGE]}}
+        del valid[index]
+
+
+def insert_reservations(rows):
+    '''
+    Insert validated rows with one `bulk_create`, returning their ids
+    '''
+    reservations = [
+        Reservation(
+            customer_id=data['customer'],
+            room_id=data['room'],
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+        )
+        for data in rows
+    ]
+    with reservation_conflict_errors():
+        Reservation.objects.bulk_create(reservations)
+
+    # bulk_create doesn't send post_save signals
+    collection_changed(Reservation)
+    occupancy.invalidate()
+
+    if connections[Reservation.objects.db].features.can_return_ids_from_bulk_insert:
+        return [reservation.id for reservation in reservations]
+
+    # No overlaps within a room, so (room, start date) identifies each new row
+    created = Reservation.objects.filter(
+        room_id__in={reservation.room_id for reservation in reservations},
+        start_date__in={reservation.start_date for reservation in reservations},
+    ).values_list('room_id', 'start_date', 'id')
+    created_ids = {(room_id, start): pk for room_id, start, pk in created}
+    return [created_ids[(reservation.room_id, reservation.start_date)] for reservation in reservations]
+
+
+def create_valid(valid, results, attempts=CONFLICT_ATTEMPTS):
+    '''
+    Check the valid rows for conflicts and insert the ones that pass
+
+    On PostgreSQL, a concurrent request can insert an overlapping
+    reservation after the check, and the exclusion constraint then rejects
+    the whole insert. The check is repeated (up to `attempts` times) so
+    that it reports the rows that conflict with the new reservation.
+    '''
+    for attempt in range(attempts):
+        validate_conflicts(valid, results)
+        if not valid:
+            return
+
+        indexes = sorted(valid)
+        try:
+            ids = insert_reservations([valid[index] for index in indexes])
+        except serializers.ValidationError:
+            if attempt == attempts - 1:
+                raise
+            continue
+
+        for index, pk in zip(indexes, ids):
+            results[index] = {'id': pk}
+        return
+
+
+def bulk_create_reservations(rows):
+    '''
+    Validate and create a batch of reservations
+
+    All rows are checked together, with a fixed number of queries no matter
+    how large the batch is, and the valid ones are inserted with a single
+    `bulk_create`. Returns one result per row, in order: `{'id': ...}` for
+    created reservations or `{'errors': ...}` for rejected rows.
+    '''
+    results = [None] * len(rows)
+    valid = {}
+
+    for index, row in enumerate(rows):
+        serializer = BulkReservationSerializer(data=row)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            results[index] = {'errors': serializer.errors}
+
+    if valid:
+        validate_related(valid, results)
+    if valid:
+        create_valid(valid, results)
+
+    return results
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+
+from core import db
+
+from reservations.models import Reservation, Room
+from reservations.versioning import get_version
+
+# Every room of the destination, with its stays overlapping the window
+# (rooms without any get a single row of NULLs), in calendar order
+CALENDAR_SQL = '''
+    SELECT room.id, room.number, reservation.id, reservation.start_date, reservation.end_date
+    FROM {room} AS room
+    LEFT JOIN {reservation} AS reservation
+        ON reservation.room_id = room.id
+        AND reservation.start_date <= %s
+        AND reservation.end_date >= %s
+    WHERE room.destination_id = %s
+    ORDER BY room.number, reservation.start_date
+'''.format(reservation=Reservation._meta.db_table, room=Room._meta.db_table)
+
+
+def room_spans(stays, start, days):
+    '''
+    Run-length encode a room's stays over a window of `days` days from `start`
+
+    `stays` are (reservation id, start date, end date) tuples in start
+    order. Returns `[length, reservation id]` spans covering the window,
+    with `None` as the id of free spans.
+    '''
+    spans = []
+    position = 0
+    for reservation_id, first, last in stays:
+        first = max((first - start).days, position)
+        after_last = min((last - start).days + 1, days)
+        if after_last <= first:
+            continue
+        if first > position:
+            spans.append([first - position, None])
+        spans.append([after_last - first, reservation_id])
+        position = after_last
+
+    if position < days:
+        spans.append([days - position, None])
+    return spans
+
+
+def destination_calendar(destination, start, end):
+    '''
+    Occupancy of each room of a destination between two dates (inclusive)
+
+    Each room's days are run-length encoded as `[length, reservation id]`
+    spans (the id being `None` while the room is free), so a room's
+    calendar costs a few numbers per stay rather than one per day. Built
+    from a single query, already sorted by room and start date, in one
+    pass. Calendars are cached until a reservation or room changes (only
+    when read from the primary, like reports).
+    '''
+    key = 'calendar_{}_{}_{}_{}_{}'.format(
+        destination.id, start.isoformat(), end.isoformat(),
+        get_version(Reservation)[0], get_version(Room)[0],
+    )
+    calendar = cache.get(key)
+    if calendar is not None:
+        return calendar
+
+    with connections[router.db_for_read(Reservation)].cursor() as cursor:
+        cursor.execute(CALENDAR_SQL, [end, start, destination.id])
+        rows = cursor.fetchall()
+
+    days = (end - start).days + 1
+    rooms = []
+    for index, (room_id, number, reservation_id, first, last) in enumerate(rows):
+        if index == 0 or room_id != rows[index - 1][0]:
+            stays = []
+            rooms.append((room_id, number, stays))
+        if reservation_id is not None:
+            stays.append((reservation_id, first, last))
+
+    calendar = {
+        'destination': destination.id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'rooms': [
+            {'id': room_id, 'number': number, 'spans': room_spans(stays, start, days)}
+            for room_id, number, stays in rooms
+        ],
+    }
+
+    if db.get_replica() is None:
+        cache.set(key, calendar, settings.REPORT_CACHE_TIMEOUT)
+    return calendar
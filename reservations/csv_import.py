@@ -0,0 +1,191 @@
+'''
+Importing reservations from CSV files
+
+Rows are read and imported a chunk at a time, so memory use doesn't grow
+with the size of the file. Customers and rooms are resolved from lookup
+maps loaded once up front, rather than with queries per row. Each chunk
+is checked for overlaps the same way bulk API requests are (one query for
+the existing reservations it could conflict with, then a pass over the
+chunk in row order, so earlier rows win), and inserted with `bulk_create`.
+Earlier chunks are already in the database by then, so overlaps between
+chunks are caught too.
+
+Files can refer to customers by `customer` id or `customer_email`, and
+to rooms by `room` id or by `destination` id and `room_number`. The CSV
+export of `/api/reservations/export/` can be imported as it is.
+'''
+import itertools
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+
+from reservations import occupancy
+from reservations.bulk import validate_conflicts
+from reservations.models import Customer, Reservation, Room
+from reservations.serializers import reservation_conflict_errors
+from reservations.versioning import collection_changed
+
+REQUIRED_MESSAGE = 'This field is required.'
+INVALID_DATE_MESSAGE = 'Date has wrong format. Use one of these formats instead: YYYY-MM-DD.'
+DOES_NOT_EXIST_MESSAGE = 'No match found.'
+AMBIGUOUS_MESSAGE = 'Matches more than one customer.'
+ORDER_MESSAGE = 'Invalid dates. Start date must come before end date.'
+
+
+class Lookups(object):
+    '''
+    Maps from the ways a file can refer to customers and rooms to their ids
+    '''
+    def __init__(self, columns):
+        self.customer_ids = set()
+        self.customer_emails = {}
+        self.room_ids = set()
+        self.room_numbers = {}
+
+        if 'customer' in columns:
+            self.customer_ids = set(Customer.objects.values_list('id', flat=True).iterator())
+        if 'customer_email' in columns:
+            for pk, email in Customer.objects.values_list('id', 'email').iterator():
+                # Emails aren't unique; None marks ones shared by several customers
+                email = email.lower()
+                self.customer_emails[email] = None if email in self.customer_emails else pk
+        if 'room' in columns:
+            self.room_ids = set(Room.objects.values_list('id', flat=True).iterator())
+        if 'room_number' in columns:
+            self.room_numbers = {
+                (destination_id, number): pk
+                for pk, destination_id, number in Room.objects.values_list('id', 'destination_id', 'number').iterator()
+            }
+
+    def customer(self, row):
+        if row.get('customer'):
+            try:
+                pk = int(row['customer'])
+            except ValueError:
+                raise serializers.ValidationError('A valid integer is required.')
+            if pk not in self.customer_ids:
+                raise serializers.ValidationError(DOES_NOT_EXIST_MESSAGE)
+            return pk
+
+        if row.get('customer_email'):
+            email = row['customer_email'].strip().lower()
+            if email not in self.customer_emails:
+                raise serializers.ValidationError(DOES_NOT_EXIST_MESSAGE)
+            if self.customer_emails[email] is None:
+                raise serializers.ValidationError(AMBIGUOUS_MESSAGE)
+            return self.customer_emails[email]
+
+        raise serializers.ValidationError(REQUIRED_MESSAGE)
+
+    def room(self, row):
+        try:
+            if row.get('room'):
+                pk = int(row['room'])
+                if pk not in self.room_ids:
+                    raise serializers.ValidationError(DOES_NOT_EXIST_MESSAGE)
+                return pk
+
+            if row.get('destination') and row.get('room_number'):
+                key = (int(row['destination']), int(row['room_number']))
+                if key not in self.room_numbers:
+                    raise serializers.ValidationError(DOES_NOT_EXIST_MESSAGE)
+                return self.room_numbers[key]
+        except ValueError:
+            raise serializers.ValidationError('A valid integer is required.')
+
+        raise serializers.ValidationError(REQUIRED_MESSAGE)
+
+
+def date_value(row, field):
+    value = (row.get(field) or '').strip()
+    if not value:
+        raise serializers.ValidationError(REQUIRED_MESSAGE)
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise serializers.ValidationError(INVALID_DATE_MESSAGE)
+    return parsed
+
+
+def parse_row(row, lookups):
+    '''
+    Validated reservation data for a CSV row, and a dict of errors (empty
+    if the row is valid)
+    '''
+    data = {}
+    errors = {}
+    parsers = (
+        ('customer', lookups.customer),
+        ('room', lookups.room),
+        ('start_date', lambda row: date_value(row, 'start_date')),
+        ('end_date', lambda row: date_value(row, 'end_date')),
+    )
+    for field, parse in parsers:
+        try:
+            data[field] = parse(row)
+        except serializers.ValidationError as e:
+            errors[field] = e.detail
+
+    if not errors and data['end_date'] < data['start_date']:
+        errors['non_field_errors'] = [ORDER_MESSAGE]
+    return data, errors
+
+
+def import_chunk(rows, lookups):
+    '''
+    Validate and insert a chunk of `(row number, row)` pairs
+
+    Returns the number of reservations created and a list of `(row
+    number, row, errors)` for the rejected rows.
+    '''
+    valid = {}
+    errors = {}
+    for number, row in rows:
+        data, row_errors = parse_row(row, lookups)
+        if row_errors:
+            errors[number] = {'errors': row_errors}
+        else:
+            valid[number] = data
+
+    with transaction.atomic():
+        if valid:
+            validate_conflicts(valid, errors)
+        if valid:
+            with reservation_conflict_errors():
+                Reservation.objects.bulk_create(
+                    Reservation(
+                        customer_id=data['customer'],
+                        room_id=data['room'],
+                        start_date=data['start_date'],
+                        end_date=data['end_date'],
+                    )
+                    for data in valid.values()
+                )
+
+    rejected = [(number, row, errors[number]['errors']) for number, row in rows if number in errors]
+    return len(valid), rejected
+
+
+def import_reservations(reader, chunk_size):
+    '''
+    Import reservations from a `csv.DictReader`, a chunk at a time
+
+    Yields `(created, rejected)` for each chunk, as returned by
+    `import_chunk`. Each chunk is committed on its own.
+    '''
+    lookups = Lookups(reader.fieldnames or [])
+    rows = zip(itertools.count(1), reader)
+
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield import_chunk(chunk, lookups)
+    finally:
+        # bulk_create doesn't send post_save signals
+        collection_changed(Reservation)
+        occupancy.invalidate()
@@ -0,0 +1,81 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from reservations.models import Reservation
+
+EXPORT_FIELDS = ('id', 'customer', 'room', 'start_date', 'end_date', 'status')
+
+# Number of rows written per chunk of the streamed response
+CHUNK_ROWS = 500
+
+
+class LineBuffer(object):
+    '''
+    File-like object that hands back whatever the csv writer writes to it
+    '''
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    '''
+    Rows of export values for each reservation in the queryset
+
+    Rows are fetched in chunks with `.iterator()` (a server-side cursor on
+    PostgreSQL), so only one chunk is ever held in memory.
+    '''
+    today = timezone.now().date()
+    rows = queryset.order_by('id').values_list(
+        'id', 'customer_id', 'room_id', 'start_date', 'end_date'
+    ).iterator()
+
+    for pk, customer_id, room_id, start_date, end_date in rows:
+        yield (
+            pk, customer_id, room_id, start_date.isoformat(), end_date.isoformat(),
+            Reservation.status_for(start_date, end_date, today),
+        )
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def csv_lines(rows):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def chunked(lines):
+    '''
+    Join lines into larger chunks to keep the number of writes down
+    '''
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_response(queryset, output):
+    '''
+    Stream the reservations in the queryset as NDJSON or CSV
+    '''
+    if output == 'csv':
+        lines = csv_lines(export_rows(queryset))
+        content_type = 'text/csv'
+    else:
+        lines = ndjson_lines(export_rows(queryset))
+        content_type = 'application/x-ndjson'
+
+    response = StreamingHttpResponse(chunked(lines), content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="reservations.{}"'.format(output)
+    return response
@@ -0,0 +1,108 @@
+import datetime
+from collections import OrderedDict
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from core import metrics
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+def get_column(serializer, field):
+    '''
+    Name of the `values()` column holding the field's value
+    '''
+    # Method fields whose value the viewset's queryset provides as an annotation
+    if isinstance(field, serializers.SerializerMethodField):
+        if field.field_name in getattr(serializer, 'annotated_fields', ()):
+            return field.field_name
+        raise UnsupportedField(field.field_name)
+
+    if field.source == '*' or '.' in field.source:
+        raise UnsupportedField(field.field_name)
+    return field.source
+
+
+def get_converter(serializer, field):
+    '''
+    Function turning a database value into the field's output, or `None` if
+    database values are already in the right form
+    '''
+    if isinstance(field, serializers.DateField):
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is None:
+            return None
+        if output_format.lower() == ISO_8601:
+            return datetime.date.isoformat
+        return lambda value: value.strftime(output_format)
+
+    if isinstance(field, (serializers.IntegerField, serializers.CharField)):
+        return None
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return None
+
+    if isinstance(field, serializers.SerializerMethodField):
+        return None
+
+    raise UnsupportedField(field.field_name)
+
+
+class ValuesSerializer(object):
+    '''
+    Read-only serialization straight from `QuerySet.values()` rows
+
+    Produces the same output as the model serializer it is built from, but
+    skips model instantiation and DRF's per-field machinery: each field is
+    read from the row and passed through a converter chosen up front. Only
+    serializers made up of simple fields are supported; see `for_serializer`.
+    '''
+    _cache = {}
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.fields = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            self.fields.append((name, get_column(serializer, field), get_converter(serializer, field)))
+
+        self.columns = [column for _, column, _ in self.fields]
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        '''
+        Shared instance for the serializer class, or `None` if the serializer
+        has fields that can't be read from `values()` rows
+        '''
+        if serializer_class not in cls._cache:
+            try:
+                cls._cache[serializer_class] = cls(serializer_class)
+            except UnsupportedField:
+                cls._cache[serializer_class] = None
+        return cls._cache[serializer_class]
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, rows):
+        return metrics.time_serialization(self._to_representation, rows)
+
+    def _to_representation(self, rows):
+        fields = self.fields
+        data = []
+
+        for row in rows:
+            item = OrderedDict()
+            for name, column, convert in fields:
+                value = row[column]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+
+        return data
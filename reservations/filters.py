@@ -0,0 +1,101 @@
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from reservations.models import Reservation
+from reservations.serializers import (
+    ArchivedReservationFilterSerializer, ReservationFilterSerializer
+)
+
+
+class StableOrderingFilter(OrderingFilter):
+    '''
+    Ordering filter that always breaks ties by id
+
+    Keeps results in a deterministic order when sorting on non-unique
+    fields, which cursor pagination relies on.
+    '''
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super(StableOrderingFilter, self).get_ordering(request, queryset, view) or [])
+        if not {'id', '-id', 'pk', '-pk'}.intersection(ordering):
+            ordering.append('id')
+        return ordering
+
+
+class CustomerSearchFilter(BaseFilterBackend):
+    '''
+    Search customers by name, email or phone prefix with `?q=`, or look one
+    up by email address with `?email=` (case-insensitive)
+    '''
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get('q')
+        if query:
+            queryset = queryset.search(query)
+
+        email = request.query_params.get('email')
+        if email:
+            queryset = queryset.filter(email__iexact=email)
+
+        return queryset
+
+
+def filter_reservations(queryset, filters):
+    '''
+    Apply validated `ReservationFilterSerializer` filters to a queryset
+    '''
+    if 'start' in filters:
+        queryset = queryset.filter(end_date__gte=filters['start'])
+    if 'end' in filters:
+        queryset = queryset.filter(start_date__lte=filters['end'])
+    if 'arrival' in filters:
+        queryset = queryset.filter(start_date=filters['arrival'])
+    if 'departure' in filters:
+        queryset = queryset.filter(end_date=filters['departure'])
+    for field in ('room', 'customer'):
+        if field in filters:
+            queryset = queryset.filter(**{field + '_id': filters[field]})
+    if 'destination' in filters:
+        queryset = queryset.filter(room__destination_id=filters['destination'])
+    return queryset
+
+
+class ReservationFilter(BaseFilterBackend):
+    '''
+    Filter reservations by date range overlap (`?start=`, `?end=`), arrival
+    or departure date, and `?room=`, `?customer=` or `?destination=` id
+
+    Each filter (alone or combined with the others) is served by one of the
+    reservation indexes.
+    '''
+    def filter_queryset(self, request, queryset, view):
+        params = ReservationFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return filter_reservations(queryset, params.validated_data)
+
+
+class ReservationStatusFilter(BaseFilterBackend):
+    '''
+    Filter reservations by check-in status with `?status=`
+    '''
+    def filter_queryset(self, request, queryset, view):
+        status = request.query_params.get('status')
+        if not status:
+            return queryset
+
+        if status not in Reservation.STATUSES:
+            raise serializers.ValidationError({
+                'status': ['Must be one of: {}.'.format(', '.join(Reservation.STATUSES))]
+            })
+        return queryset.with_status_filter(status, timezone.now().date())
+
+
+class ArchivedReservationFilter(BaseFilterBackend):
+    '''
+    Filter archived reservations by `?customer=` and `?room=` id
+    '''
+    def filter_queryset(self, request, queryset, view):
+        params = ArchivedReservationFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return queryset.filter(**{
+            field + '_id': value for field, value in params.validated_data.items()
+        })
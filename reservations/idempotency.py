@@ -0,0 +1,210 @@
+'''
+`Idempotency-Key` support for write endpoints
+
+A client that times out can't tell whether its request went through, and
+retrying a reservation that did would fail as a conflict with itself.
+Requests sent with an `Idempotency-Key` header have their successful
+response stored (for `IDEMPOTENCY_KEY_TTL` seconds, in the `idempotency`
+cache), and requests repeating the key get that response back instead of
+being processed again. A repeat arriving while the first request is still
+being processed waits for its response.
+
+Keys are per user. Error responses aren't stored, so a failed request can
+be retried with the same key.
+'''
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+# Seconds between checks for the response of a request being processed
+POLL_INTERVAL = 0.05
+
+# Locks aren't deleted this close (in seconds) to their expiry, in case
+# the cache expires them a little early
+LOCK_MARGIN = 1
+
+# Response headers stored and replayed along with the data
+STORED_HEADERS = ('Location',)
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used for a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+class IdempotentRequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still being processed.'
+    default_code = 'idempotent_request_in_progress'
+
+
+def get_cache():
+    return caches['idempotency']
+
+
+def get_response_key(user, key):
+    '''
+    Cache key of the response stored for a user's `Idempotency-Key`, which
+    is also the prefix of the key locked while the request is processed
+    '''
+    return 'idempotency_{}'.format(hashlib.sha256('{}:{}'.format(user.pk, key).encode('utf-8')).hexdigest())
+
+
+def fingerprint(request):
+    '''
+    Hash of what a request asks for, to tell a repeat of it from a
+    different request reusing its key
+    '''
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = sorted(data.lists())
+    content = json.dumps([request.method, request.get_full_path(), data], sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def has_stored_response(request):
+    '''
+    Whether the request repeats an `Idempotency-Key` with a stored
+    response, which it will get back without being processed
+    '''
+    key = request.META.get(HEADER)
+    if not key or len(key) > MAX_KEY_LENGTH or not request.user.is_authenticated:
+        return False
+    return get_cache().get(get_response_key(request.user, key)) is not None
+
+
+def replay(stored, request_fingerprint):
+    if stored['fingerprint'] != request_fingerprint:
+        raise IdempotencyKeyReused()
+
+    response = Response(stored['data'], status=stored['status'], headers=stored['headers'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+class IdempotentRequest(object):
+    '''
+    The stored response and processing lock for a user's `Idempotency-Key`
+    '''
+    def __init__(self, request, key):
+        self.cache = get_cache()
+        self.response_key = get_response_key(request.user, key)
+        self.lock_key = self.response_key + '_lock'
+        self.lock = uuid.uuid4().hex
+        self.lock_expires = None
+        self.fingerprint = fingerprint(request)
+
+    def acquire(self):
+        '''
+        Take the lock for processing the request, waiting while another
+        request with the key holds it
+
+        Returns the stored response instead if there is one.
+        '''
+        deadline = time.time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            # Taken before trying, so it can only be earlier than the real expiry
+            lock_expires = time.time() + settings.IDEMPOTENCY_LOCK_SECONDS
+            if self.cache.add(self.lock_key, self.lock, settings.IDEMPOTENCY_LOCK_SECONDS):
+                self.lock_expires = lock_expires
+                break
+
+            stored = self.cache.get(self.response_key)
+            if stored is not None:
+                return replay(stored, self.fingerprint)
+            if time.time() >= deadline:
+                raise IdempotentRequestInProgress()
+            time.sleep(POLL_INTERVAL)
+
+        # The holder may have stored its response just before we got the lock
+        stored = self.cache.get(self.response_key)
+        if stored is not None:
+            self.release()
+            return replay(stored, self.fingerprint)
+        return None
+
+    def release(self):
+        '''
+        Delete the lock, unless it may have expired
+
+        The cache can't delete a key only if it still holds our value, but
+        until our lock expires no other request can have taken it, so
+        deleting it before then can't release someone else's. After that
+        it's left to expire (if it hasn't already).
+        '''
+        if self.lock_expires is not None and time.time() < self.lock_expires - LOCK_MARGIN:
+            self.cache.delete(self.lock_key)
+        self.lock_expires = None
+
+    def store(self, response):
+        '''
+        Store a response for replaying and release the lock, once the
+        current transaction commits (so only committed changes are replayed)
+        '''
+        stored = {
+            'fingerprint': self.fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+            'headers': {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+        }
+
+        def save():
+            self.cache.set(self.response_key, stored, settings.IDEMPOTENCY_KEY_TTL)
+            self.release()
+
+        transaction.on_commit(save)
+
+
+class IdempotencyMixin(object):
+    '''
+    Process requests with the same `Idempotency-Key` only once
+
+    Views wrap their write handlers with `idempotent_response`, the way
+    `ConditionalGetMixin` wraps reads. This happens after authentication,
+    so keys are scoped to the user.
+    '''
+    def create(self, request, *args, **kwargs):
+        handler = super(IdempotencyMixin, self).create
+        return self.idempotent_response(handler, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        handler = super(IdempotencyMixin, self).update
+        return self.idempotent_response(handler, request, *args, **kwargs)
+
+    def idempotent_response(self, handler, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return handler(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise serializers.ValidationError({
+                'Idempotency-Key': ['Ensure this header has no more than {} characters.'.format(MAX_KEY_LENGTH)]
+            })
+
+        idempotent_request = IdempotentRequest(request, key)
+        replayed = idempotent_request.acquire()
+        if replayed is not None:
+            return replayed
+
+        try:
+            response = handler(request, *args, **kwargs)
+        except Exception:
+            idempotent_request.release()
+            raise
+
+        if status.is_success(response.status_code):
+            idempotent_request.store(response)
+        else:
+            idempotent_request.release()
+        return response
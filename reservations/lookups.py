@@ -0,0 +1,66 @@
+import string
+import sys
+
+from django.db.models import CharField, lookups
+from django.utils import six
+
+# SQLite's NOCASE collation (like its LIKE operator) only folds ASCII letters
+ASCII_LOWER = {ord(upper): lower for upper, lower in zip(string.ascii_uppercase, string.ascii_lowercase)}
+
+
+class NoCaseLookupMixin(object):
+    '''
+    Case-insensitive text lookups that SQLite can answer from a
+    `COLLATE NOCASE` index
+
+    Django compiles these to `LIKE`, which SQLite only optimizes when the
+    pattern is a literal, never for a bound parameter, so every lookup is a
+    full table scan. Comparisons under the NOCASE collation match the same
+    rows (both fold ASCII letters only) and can use the index. Other
+    backends are unchanged.
+    '''
+    def as_sqlite(self, compiler, connection):
+        if not isinstance(self.rhs, six.string_types) or not self.rhs:
+            return self.as_sql(compiler, connection)
+
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        sql, params = self.nocase_sql(lhs, self.rhs.translate(ASCII_LOWER))
+        return sql, lhs_params + params
+
+
+@CharField.register_lookup
+class IExact(NoCaseLookupMixin, lookups.IExact):
+    def nocase_sql(self, lhs, value):
+        return '{} = %s COLLATE NOCASE'.format(lhs), [value]
+
+
+def nocase_successor(char):
+    '''
+    The first character sorting after `char` under the NOCASE collation, or
+    None if there is none
+
+    Uppercase ASCII letters sort as lowercase ones, so they are skipped, and
+    so are surrogates, which can't be encoded.
+    '''
+    code = ord(char) + 1
+    if ord('A') <= code <= ord('Z'):
+        code = ord('Z') + 1
+    elif 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    if code > sys.maxunicode:
+        return None
+    return six.unichr(code)
+
+
+@CharField.register_lookup
+class IStartsWith(NoCaseLookupMixin, lookups.IStartsWith):
+    def as_sqlite(self, compiler, connection):
+        if isinstance(self.rhs, six.string_types) and self.rhs and nocase_successor(self.rhs[-1]) is None:
+            return self.as_sql(compiler, connection)
+        return super(IStartsWith, self).as_sqlite(compiler, connection)
+
+    def nocase_sql(self, lhs, value):
+        # Strings starting with the prefix sort between it and the prefix
+        # with its last character incremented
+        after = value[:-1] + nocase_successor(value[-1])
+        return '({lhs} >= %s COLLATE NOCASE AND {lhs} < %s COLLATE NOCASE)'.format(lhs=lhs), [value, after]
@@ -0,0 +1,38 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reservations.archive import archive_reservations
+
+
+class Command(BaseCommand):
+    help = 'Move reservations that ended a while ago to the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Archive reservations that ended more than this many days ago'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Reservations moved per transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must not be negative and --batch-size must be positive.')
+
+        cutoff = timezone.now().date() - datetime.timedelta(days=options['days'])
+        started = time.time()
+        total = 0
+
+        for moved in archive_reservations(cutoff, options['batch_size']):
+            total += moved
+            if options['verbosity'] > 1:
+                self.stdout.write('Archived {} reservations so far.'.format(total))
+            time.sleep(options['pause'])
+
+        self.stdout.write('Archived {} reservations that ended before {} in {:.1f}s.'.format(
+            total, cutoff.isoformat(), time.time() - started
+        ))
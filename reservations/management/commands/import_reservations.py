@@ -0,0 +1,56 @@
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from reservations.csv_import import import_reservations
+
+
+class Command(BaseCommand):
+    help = 'Import reservations from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument(
+            '--report', help='Where to write rejected rows and their errors (default: <path>.rejected.csv)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows checked and inserted at a time')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        report_path = options['report'] or options['path'] + '.rejected.csv'
+
+        started = time.time()
+        created = rejected = 0
+        with open(options['path'], newline='') as source, open(report_path, 'w', newline='') as report:
+            reader = csv.DictReader(source)
+            writer = csv.writer(report)
+            writer.writerow(['row'] + list(reader.fieldnames or []) + ['errors'])
+
+            try:
+                for chunk_created, chunk_rejected in import_reservations(reader, options['chunk_size']):
+                    created += chunk_created
+                    rejected += len(chunk_rejected)
+                    for number, row, errors in chunk_rejected:
+                        writer.writerow([number] + [row.get(name) for name in reader.fieldnames] + [
+                            json.dumps(errors, sort_keys=True)
+                        ])
+                    if options['verbosity'] > 1:
+                        self.stdout.write('{} rows imported, {} rejected so far.'.format(created, rejected))
+            except serializers.ValidationError:
+                # Another reservation was created for the same room and dates
+                # while the chunk was being checked
+                raise CommandError(
+                    'Conflicting reservations were created during the import. Rows after row {} were not '
+                    'imported.'.format(created + rejected)
+                )
+
+        elapsed = time.time() - started
+        self.stdout.write('Imported {} reservations and rejected {} rows in {:.1f}s ({:.0f} rows/sec).'.format(
+            created, rejected, elapsed, (created + rejected) / elapsed if elapsed else 0
+        ))
+        if rejected:
+            self.stdout.write('Rejected rows were written to {}.'.format(report_path))
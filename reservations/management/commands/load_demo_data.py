@@ -1,14 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import datetime
+import itertools
 import random
+import time
 
 from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils import timezone
 from faker import Faker
 
-from reservations.models import Customer, Destination
+from reservations import occupancy
+from reservations.models import Customer, Destination, Reservation, Room
+from reservations.versioning import collection_changed
 from tests.helpers import create_user, populate_rooms
 
 fake = Faker()
@@ -25,14 +31,29 @@ def random_phone_number():
     )
 
 
-def populate_fake_customers(num):
-    for _ in range(num):
-        Customer.objects.create(
+def bulk_create_chunked(model, objs, batch_size):
+    '''
+    Insert objects from an iterable in chunks, without holding them all in memory
+    '''
+    objs = iter(objs)
+    while True:
+        chunk = list(itertools.islice(objs, batch_size))
+        if not chunk:
+            break
+        model.objects.bulk_create(chunk)
+
+
+def populate_fake_customers(num, batch_size):
+    customers = (
+        Customer(
             first_name=fake.first_name(),
             last_name=fake.last_name(),
             phone=random_phone_number(),
             email=fake.email()
         )
+        for _ in range(num)
+    )
+    bulk_create_chunked(Customer, customers, batch_size)
 
 
 def populate_fake_destinations(num):
@@ -54,6 +75,41 @@ def populate_fake_destinations(num):
         populate_rooms(destination, floors, rooms_per_floor)
 
 
+def fake_reservations(num, room_ids, customer_ids):
+    '''
+    Generate non-conflicting reservations spread evenly over the given rooms
+
+    Each room gets back-to-back stays of 1-7 days separated by gaps of 1-5
+    days, centred around today so there's a mix of pending, in-house and
+    checked out reservations.
+    '''
+    per_room, extra = divmod(num, len(room_ids))
+
+    for index, room_id in enumerate(room_ids):
+        count = per_room + (1 if index < extra else 0)
+
+        # Average stay plus gap is 7 days
+        day = timezone.now().date().toordinal() - count * 7 // 2
+        for _ in range(count):
+            end = day + random.randint(0, 6)
+            yield Reservation(
+                customer_id=random.choice(customer_ids),
+                room_id=room_id,
+                start_date=datetime.date.fromordinal(day),
+                end_date=datetime.date.fromordinal(end),
+            )
+            day = end + random.randint(1, 5)
+
+
+def populate_fake_reservations(num, batch_size):
+    room_ids = list(Room.objects.values_list('id', flat=True))
+    customer_ids = list(Customer.objects.values_list('id', flat=True))
+    if not room_ids or not customer_ids:
+        raise CommandError('Reservations need at least one room and one customer.')
+
+    bulk_create_chunked(Reservation, fake_reservations(num, room_ids, customer_ids), batch_size)
+
+
 def create_test_user():
     User = get_user_model()
     username = 'testuser'
@@ -68,12 +124,34 @@ def create_test_user():
 class Command(BaseCommand):
     help = 'Populate with demo data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--destinations', type=int, default=2, help='Number of destinations to add')
+        parser.add_argument('--customers', type=int, default=4, help='Number of customers to add')
+        parser.add_argument('--reservations', type=int, default=0, help='Number of reservations to add')
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+
     def handle(self, *args, **options):
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+            fake.seed(options['seed'])
+
+        started = time.time()
         with transaction.atomic():
-            num_destinations = 2
-            num_customers = 4
+            num_destinations = options['destinations']
+            num_customers = options['customers']
+            num_reservations = options['reservations']
             populate_fake_destinations(num_destinations)
-            populate_fake_customers(num_customers)
+            populate_fake_customers(num_customers, options['batch_size'])
+            if num_reservations:
+                populate_fake_reservations(num_reservations, options['batch_size'])
             create_test_user()
 
-            print('Added demo data for {} destinations and {} customers!'.format(num_destinations, num_customers))
+            # Bulk inserts don't send signals
+            for model in (Customer, Destination, Reservation, Room):
+                collection_changed(model)
+            occupancy.invalidate()
+
+            print('Added demo data for {} destinations, {} customers and {} reservations in {:.1f}s!'.format(
+                num_destinations, num_customers, num_reservations, time.time() - started
+            ))
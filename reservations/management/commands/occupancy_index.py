@@ -0,0 +1,64 @@
+import datetime
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reservations import occupancy
+from reservations.models import Destination, Room
+
+
+class Command(BaseCommand):
+    help = 'Check the occupancy index against the database, or make all processes rebuild it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true', help='Make every server process rebuild its index'
+        )
+        parser.add_argument(
+            '--samples', type=int, default=100, help='Random availability searches to compare with SQL'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            # Outside a transaction, so this takes effect immediately
+            occupancy.change_count(increment=True)
+            self.stdout.write('Server processes will rebuild their occupancy index on their next search.')
+            return
+
+        started = time.time()
+        index = occupancy.OccupancyIndex.build(timezone.now().date(), settings.OCCUPANCY_INDEX_DAYS)
+        self.stdout.write('Built index of {} rooms over {} days ({} KiB) in {:.2f}s.'.format(
+            len(index.room_ids), index.days, index.bits.nbytes // 1024, time.time() - started
+        ))
+
+        problems = index.check()
+        if problems['double_booked_rooms']:
+            self.stdout.write('Rooms with overlapping reservations: {}'.format(problems['double_booked_rooms']))
+
+        mismatches = self.compare_searches(index, options['samples']) + problems['mismatched_rooms']
+        if mismatches:
+            raise CommandError('Index differs from the database for rooms: {}'.format(sorted(set(mismatches))))
+        self.stdout.write('Index matches the database.')
+
+    def compare_searches(self, index, samples):
+        '''
+        Compare random availability searches with the SQL query, returning
+        the ids of rooms they disagree on
+        '''
+        destination_ids = list(Destination.objects.values_list('id', flat=True))
+        last_day = index.origin + datetime.timedelta(days=index.days - 1)
+        mismatches = []
+
+        for _ in range(samples if destination_ids else 0):
+            destination_id = random.choice(destination_ids)
+            start = index.origin + datetime.timedelta(days=random.randrange(index.days))
+            end = min(start + datetime.timedelta(days=random.randrange(14)), last_day)
+
+            rooms = Room.objects.filter(destination_id=destination_id).available(start, end)
+            expected = set(rooms.values_list('id', flat=True))
+            mismatches.extend(expected.symmetric_difference(index.free_rooms(destination_id, start, end)))
+
+        return mismatches
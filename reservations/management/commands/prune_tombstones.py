@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reservations.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete records of deleted objects that delta sync no longer needs'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write('Deleted {} tombstones older than {} days.'.format(
+            deleted, settings.TOMBSTONE_RETENTION_DAYS
+        ))
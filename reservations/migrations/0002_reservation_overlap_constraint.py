@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:10
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def add_overlap_constraint(apps, schema_editor):
+    '''
+    Reject overlapping reservations for the same room at the database level
+
+    Only PostgreSQL supports exclusion constraints; other backends rely on
+    the (room, start_date, end_date) index and the serializer validator.
+    '''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        'ALTER TABLE reservations_reservation '
+        'ADD CONSTRAINT reservations_reservation_no_overlap '
+        'EXCLUDE USING gist (room_id WITH =, daterange(start_date, end_date, \'[]\') WITH &&)'
+    )
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'ALTER TABLE reservations_reservation '
+        'DROP CONSTRAINT IF EXISTS reservations_reservation_no_overlap'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['room', 'start_date', 'end_date'], name='reservation_room_dates_idx'),
+        ),
+        migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+    ]
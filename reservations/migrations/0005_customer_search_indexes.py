@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+SEARCH_FIELDS = ('last_name', 'first_name', 'email', 'phone')
+
+# Index definitions that case-insensitive prefix (`istartswith`) and
+# `iexact` lookups can use on each backend
+INDEX_EXPRESSIONS = {
+    # Django compares UPPER(column::text) with LIKE; text_pattern_ops makes
+    # the index usable for LIKE regardless of the database collation
+    'postgresql': 'UPPER({column}::text) text_pattern_ops',
+    # SQLite's LIKE is case-insensitive, and can use NOCASE indexes
+    'sqlite': '{column} COLLATE NOCASE',
+}
+
+
+def index_name(field):
+    return 'customer_{}_search_idx'.format(field)
+
+
+def add_search_indexes(apps, schema_editor):
+    expression = INDEX_EXPRESSIONS.get(schema_editor.connection.vendor, '{column}')
+    quote_name = schema_editor.quote_name
+
+    for field in SEARCH_FIELDS:
+        schema_editor.execute('CREATE INDEX {} ON {} ({})'.format(
+            quote_name(index_name(field)),
+            quote_name('reservations_customer'),
+            expression.format(column=quote_name(field)),
+        ))
+
+
+def remove_search_indexes(apps, schema_editor):
+    for field in SEARCH_FIELDS:
+        if schema_editor.connection.vendor == 'mysql':
+            schema_editor.execute('DROP INDEX {} ON {}'.format(
+                schema_editor.quote_name(index_name(field)), schema_editor.quote_name('reservations_customer')
+            ))
+        else:
+            schema_editor.execute('DROP INDEX {}'.format(schema_editor.quote_name(index_name(field))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
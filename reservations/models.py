@@ -1,11 +1,145 @@
 from django.db import models
+from django.db.models import Case, CharField, Q, Value, When
+from django.utils import timezone
+
+from reservations import lookups  # noqa: F401 (registers lookups)
+
+
+class ReservationQuerySet(models.QuerySet):
+    def overlapping(self, start, end):
+        '''
+        Reservations whose date range overlaps the given range
+
+        Both ranges are inclusive, so a reservation ending on the same day
+        another one starts counts as a conflict.
+        '''
+        return self.filter(start_date__lte=end, end_date__gte=start)
+
+    def with_status(self, today):
+        '''
+        Annotate each reservation with its check-in `status` on `today`
+
+        Same result as `Reservation.status_for`, but computed by the database
+        so it can be used for ordering.
+        '''
+        return self.annotate(status=Case(
+            When(start_date__gt=today, then=Value(Reservation.PENDING)),
+            When(end_date__lt=today, then=Value(Reservation.CHECKED_OUT)),
+            default=Value(Reservation.IN_HOUSE),
+            output_field=CharField(),
+        ))
+
+    def with_status_filter(self, status, today):
+        '''
+        Reservations with the given check-in status on `today`
+
+        Filters on the date columns directly (rather than the `status`
+        annotation) so the date indexes can be used.
+        '''
+        if status == Reservation.PENDING:
+            return self.filter(start_date__gt=today)
+        elif status == Reservation.IN_HOUSE:
+            return self.filter(start_date__lte=today, end_date__gte=today)
+        elif status == Reservation.CHECKED_OUT:
+            return self.filter(end_date__lt=today)
+        raise ValueError('Unknown reservation status: {}'.format(status))
+
+
+class RoomQuerySet(models.QuerySet):
+    def available(self, start, end):
+        '''
+        Rooms with no reservation overlapping the given date range
+
+        Done as a single anti-join against the reservation table, rather
+        than fetching reservations and checking overlaps in Python.
+        '''
+        booked = Reservation.objects.overlapping(start, end).values('room_id')
+        return self.exclude(id__in=booked)
+
+
+class CustomerQuerySet(models.QuerySet):
+    # Fields matched by `search`, all backed by case-insensitive indexes
+    SEARCH_FIELDS = ('last_name', 'first_name', 'email', 'phone')
+
+    def search(self, query):
+        '''
+        Customers matching every word of the query
+
+        A word matches if it's a case-insensitive prefix of any of the
+        `SEARCH_FIELDS`, so each one is answered by index range scans.
+        '''
+        queryset = self
+        for term in query.split():
+            matches = Q()
+            for field in self.SEARCH_FIELDS:
+                matches |= Q(**{field + '__istartswith': term})
+            queryset = queryset.filter(matches)
+        return queryset
 
 
 class Reservation(models.Model):
+    # Name of the PostgreSQL exclusion constraint that rejects overlapping
+    # reservations. Other backends have no constraint and rely on the
+    # serializer's validator.
+    OVERLAP_CONSTRAINT = 'reservations_reservation_no_overlap'
+
+    # Check-in statuses, depending on where today falls relative to the stay
+    PENDING = 'pending'
+    IN_HOUSE = 'in_house'
+    CHECKED_OUT = 'checked_out'
+    STATUSES = (PENDING, IN_HOUSE, CHECKED_OUT)
+
+    # Indexed by reservation_customer_dates_idx
+    customer = models.ForeignKey('Customer', on_delete=models.CASCADE, db_index=False)
+    room = models.ForeignKey('Room', on_delete=models.CASCADE)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'start_date', 'end_date'], name='reservation_room_dates_idx'),
+            models.Index(fields=['end_date', 'start_date'], name='reservation_end_start_idx'),
+            models.Index(fields=['start_date'], name='reservation_start_idx'),
+            models.Index(fields=['room', 'end_date'], name='reservation_room_end_idx'),
+            models.Index(fields=['customer', 'start_date', 'end_date'], name='reservation_customer_dates_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.customer)
+
+    @classmethod
+    def status_for(cls, start_date, end_date, today):
+        '''
+        Check-in status (pending, in_house, or checked_out) of a stay on `today`
+        '''
+        if today < start_date:
+            return cls.PENDING
+        elif start_date <= today <= end_date:
+            return cls.IN_HOUSE
+        else:
+            return cls.CHECKED_OUT
+
+
+class ArchivedReservation(models.Model):
+    '''
+    Reservation moved out of the live table once it's long over (see
+    `reservations.archive`), keeping its original id
+    '''
+    id = models.IntegerField(primary_key=True)
     customer = models.ForeignKey('Customer', on_delete=models.CASCADE)
     room = models.ForeignKey('Room', on_delete=models.CASCADE)
     start_date = models.DateField()
     end_date = models.DateField()
+    updated_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['end_date', 'start_date'], name='archived_end_start_idx'),
+        ]
 
     def __str__(self):
         return str(self.customer)
@@ -14,6 +148,9 @@ class Reservation(models.Model):
 class Room(models.Model):
     number = models.IntegerField()
     destination = models.ForeignKey('Destination', on_delete=models.CASCADE, related_name='rooms')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = RoomQuerySet.as_manager()
 
     class Meta:
         unique_together = ('number', 'destination')
@@ -29,6 +166,7 @@ class Destination(models.Model):
     city = models.CharField(max_length=120)
     state = models.CharField(max_length=2)
     zip = models.CharField(max_length=10)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -40,6 +178,27 @@ class Customer(models.Model):
     last_name = models.CharField(max_length=120)
     phone = models.CharField(max_length=120)
     email = models.EmailField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = CustomerQuerySet.as_manager()
 
     def __str__(self):
         return '{}, {}'.format(self.last_name, self.first_name)
+
+
+class Tombstone(models.Model):
+    '''
+    Record of a deleted object, so delta sync clients can remove it too
+    '''
+    # `app_label.modelname` of the deleted object
+    model = models.CharField(max_length=100)
+    object_id = models.IntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return '{} {}'.format(self.model, self.object_id)
@@ -0,0 +1,301 @@
+'''
+In-process occupancy index for availability searches
+
+Each process keeps one bit per day per room (set while the room is booked)
+over the next `settings.OCCUPANCY_INDEX_DAYS` days, packed into rows of
+64-bit words. "Which rooms are free for every night in [start, end]" is then
+a masked AND over the destination's rows, without touching the database.
+
+The index is updated from reservation signals once the change commits.
+Every committed change (in any process) increments a counter in the
+shared cache and is logged there under its number, so a process that
+missed changes made elsewhere replays them from the log on its next
+search. It only rebuilds from the database when a change is missing from
+the log: changes that bypass signals (bulk inserts, room changes) call
+`invalidate`, which counts a change without logging it, and log entries
+expire after `LOG_TIMEOUT` seconds.
+'''
+import datetime
+import random
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from reservations.models import Reservation, Room
+
+CHANGES_KEY = 'occupancy_index_changes'
+LOG_KEY = 'occupancy_index_change_{}'
+LOG_TIMEOUT = 60 * 60
+WORD_BITS = 64
+
+# Processes further behind than this rebuild rather than replay the log
+MAX_REPLAY = 1000
+
+_index = None
+_lock = threading.RLock()
+
+
+def change_count(increment=False):
+    '''
+    Number of reservation changes committed so far, shared by all processes
+
+    A counter evicted from the cache restarts at a random value, so it
+    can't come back to a count some process has already seen.
+    '''
+    if increment:
+        try:
+            return cache.incr(CHANGES_KEY)
+        except ValueError:
+            pass
+    cache.add(CHANGES_KEY, random.getrandbits(62), None)
+    return cache.incr(CHANGES_KEY) if increment else cache.get(CHANGES_KEY)
+
+
+def pack(occupied):
+    '''
+    Pack a boolean (rooms x days) array into (rooms x words) uint64 words,
+    day `n` being bit `n % 64` of word `n // 64`
+    '''
+    rooms, days = occupied.shape
+    padded = np.zeros((rooms, -(-days // WORD_BITS) * WORD_BITS), dtype=np.uint64)
+    padded[:, :days] = occupied
+    weights = np.left_shift(np.uint64(1), np.arange(WORD_BITS, dtype=np.uint64))
+    return (padded.reshape(rooms, -1, WORD_BITS) * weights).sum(axis=2, dtype=np.uint64)
+
+
+class OccupancyIndex(object):
+    '''
+    Occupied days per room from `origin` for `days` days
+
+    `bits` has a row of words per room (in `room_ids` order), and
+    `destination_rows` maps destination ids to their rooms' rows. `changes`
+    is the shared change count the index is up to date with.
+    '''
+    def __init__(self, origin, days, room_ids, destination_ids, bits, changes):
+        self.origin = origin
+        self.days = days
+        self.room_ids = room_ids
+        self.room_rows = {room_id: row for row, room_id in enumerate(room_ids.tolist())}
+        self.destination_rows = {
+            destination_id: np.flatnonzero(destination_ids == destination_id)
+            for destination_id in np.unique(destination_ids).tolist()
+        }
+        self.bits = bits
+        self.changes = changes
+
+    @classmethod
+    def daily_counts(cls, origin, days, room_ids):
+        '''
+        Number of reservations per room and day, from the database
+        '''
+        stays = np.array(list(
+            Reservation.objects.using(DEFAULT_DB_ALIAS).overlapping(
+                origin, origin + datetime.timedelta(days=days - 1)
+            ).values_list('room_id', 'start_date', 'end_date')
+        ), dtype=object).reshape(-1, 3)
+        stays = stays[np.isin(stays[:, 0].astype(np.int64), room_ids)]
+
+        rows = np.searchsorted(room_ids, stays[:, 0].astype(np.int64))
+        offsets = (stays[:, 1:].astype('datetime64[D]') - np.datetime64(origin, 'D')).astype(np.int64)
+        first = np.clip(offsets[:, 0], 0, days)
+        after_last = np.clip(offsets[:, 1] + 1, 0, days)
+
+        # +1 on each stay's first day and -1 after its last, summed along the days
+        changes = np.zeros((len(room_ids), days + 1), dtype=np.int32)
+        np.add.at(changes, (rows, first), 1)
+        np.add.at(changes, (rows, after_last), -1)
+        return np.cumsum(changes[:, :days], axis=1)
+
+    @classmethod
+    def build(cls, origin, days):
+        # Read the change count first: changes committed while loading are
+        # then either included or counted, and trigger another rebuild
+        changes = change_count()
+
+        rooms = np.array(
+            list(Room.objects.using(DEFAULT_DB_ALIAS).order_by('id').values_list('id', 'destination_id')),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        occupied = cls.daily_counts(origin, days, rooms[:, 0]) > 0
+        return cls(origin, days, rooms[:, 0], rooms[:, 1], pack(occupied), changes)
+
+    def offsets(self, start, end):
+        '''
+        Day offsets of an inclusive date range clipped to the index, or
+        `None` if they don't overlap
+        '''
+        first = max((start - self.origin).days, 0)
+        last = min((end - self.origin).days, self.days - 1)
+        return (first, last) if first <= last else None
+
+    def mask(self, first, last):
+        '''
+        Words `first // 64` to `last // 64` with the bits for days `first`
+        to `last` set
+        '''
+        base = first // WORD_BITS * WORD_BITS
+        days = np.zeros((1, last - base + 1), dtype=bool)
+        days[0, first - base:] = True
+        return pack(days)[0]
+
+    def covers(self, start, end):
+        return start >= self.origin and (end - self.origin).days < self.days
+
+    def mark(self, room_id, start, end, occupied):
+        row = self.room_rows.get(room_id)
+        offsets = self.offsets(start, end)
+        if row is None or offsets is None:
+            return
+
+        first, last = offsets
+        words = slice(first // WORD_BITS, last // WORD_BITS + 1)
+        if occupied:
+            self.bits[row, words] |= self.mask(first, last)
+        else:
+            self.bits[row, words] &= ~self.mask(first, last)
+
+    def apply(self, removed, added):
+        for room_id, start, end in removed:
+            self.mark(room_id, start, end, occupied=False)
+        for room_id, start, end in added:
+            self.mark(room_id, start, end, occupied=True)
+
+    def free_rooms(self, destination_id, start, end):
+        '''
+        Ids of the destination's rooms with no occupied day between `start`
+        and `end` (inclusive), which have to be within the index
+        '''
+        rows = self.destination_rows.get(destination_id, np.array([], dtype=np.int64))
+        first, last = self.offsets(start, end)
+        words = self.bits[rows, first // WORD_BITS:last // WORD_BITS + 1]
+        busy = (words & self.mask(first, last)).any(axis=1)
+        return self.room_ids[rows[~busy]].tolist()
+
+    def check(self):
+        '''
+        Compare the index with the database
+
+        Returns the ids of rooms whose bits differ from the database (or
+        that were added or removed since the index was built), and of rooms
+        with overlapping reservations, which a bitmap can't represent.
+        '''
+        room_ids = set(Room.objects.using(DEFAULT_DB_ALIAS).values_list('id', flat=True))
+        counts = self.daily_counts(self.origin, self.days, self.room_ids)
+        mismatched = (pack(counts > 0) != self.bits).any(axis=1)
+        return {
+            'mismatched_rooms': sorted(set(self.room_ids[mismatched].tolist()) | (room_ids ^ set(self.room_rows))),
+            'double_booked_rooms': self.room_ids[(counts > 1).any(axis=1)].tolist(),
+        }
+
+
+def logged_changes(first, last):
+    '''
+    Logged `(removed, added)` stays of changes `first` to `last`, in order,
+    or `None` if any of them is missing
+    '''
+    keys = [LOG_KEY.format(changes) for changes in range(first, last + 1)]
+    logged = cache.get_many(keys)
+    if len(logged) < len(keys):
+        return None
+    return [logged[key] for key in keys]
+
+
+def get_index():
+    '''
+    This process's index, brought up to date with changes made by other
+    processes, or rebuilt if it can't be or the day has moved on
+    '''
+    global _index
+    today = timezone.now().date()
+    with _lock:
+        if _index is not None and _index.origin == today:
+            changes = change_count()
+            if _index.changes < changes <= _index.changes + MAX_REPLAY:
+                logged = logged_changes(_index.changes + 1, changes)
+                if logged is not None:
+                    for removed, added in logged:
+                        _index.apply(removed, added)
+                    _index.changes = changes
+            if _index.changes == changes:
+                return _index
+
+        _index = OccupancyIndex.build(today, settings.OCCUPANCY_INDEX_DAYS)
+        return _index
+
+
+def free_rooms(destination_id, start, end):
+    '''
+    Ids of the destination's free rooms for the date range, or `None` if
+    the range is outside the index
+    '''
+    index = get_index()
+    if not index.covers(start, end):
+        return None
+    return index.free_rooms(destination_id, start, end)
+
+
+def apply_change(removed, added):
+    '''
+    Count and log a committed change, and apply it to this process's
+    index if it's up to date (otherwise it catches up from the log)
+    '''
+    changes = change_count(increment=True)
+    cache.set(LOG_KEY.format(changes), (removed, added), LOG_TIMEOUT)
+    with _lock:
+        if _index is not None and changes == _index.changes + 1:
+            _index.apply(removed, added)
+            _index.changes = changes
+
+
+def invalidate():
+    '''
+    Make every process rebuild its index, once the current transaction
+    commits
+    '''
+    if settings.OCCUPANCY_INDEX:
+        transaction.on_commit(lambda: change_count(increment=True))
+
+
+def stay(reservation):
+    # Dates may still be strings if that's what the reservation was created with
+    to_date = Reservation._meta.get_field('start_date').to_python
+    return (reservation.room_id, to_date(reservation.start_date), to_date(reservation.end_date))
+
+
+def reservation_pre_save(sender, instance, raw=False, **kwargs):
+    '''
+    Remember an updated reservation's previous room and dates, to clear
+    them from the index
+
+    Fetched even if this process has no index yet, since it may build one
+    before the change commits, and other processes replay the change.
+    '''
+    if not settings.OCCUPANCY_INDEX or raw or instance._state.adding:
+        return
+    instance._occupancy_previous = Reservation.objects.using(DEFAULT_DB_ALIAS).filter(
+        pk=instance.pk
+    ).values_list('room_id', 'start_date', 'end_date').first()
+
+
+def reservation_saved(sender, instance, raw=False, **kwargs):
+    if not settings.OCCUPANCY_INDEX or raw:
+        return
+    previous = getattr(instance, '_occupancy_previous', None)
+    removed = [previous] if previous else []
+    added = [stay(instance)]
+    transaction.on_commit(lambda: apply_change(removed, added))
+
+
+def reservation_deleted(sender, instance, **kwargs):
+    if not settings.OCCUPANCY_INDEX:
+        return
+    removed = [stay(instance)]
+    transaction.on_commit(lambda: apply_change(removed, []))
+
+
+def rooms_changed(sender, **kwargs):
+    invalidate()
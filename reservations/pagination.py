@@ -0,0 +1,108 @@
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import six
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+def keyset_filter(ordering, position, reverse):
+    '''
+    Q object for the rows after `position` in `ordering`
+
+    `ordering` is a list of field names (`-` for descending) and `position`
+    the matching values of the row the page starts after. Rows after it
+    are the ones greater in the first field, or equal in it and after it
+    in the remaining fields. The leading field is also bounded on its own
+    (`>=`), so the database can scan an index on it.
+    '''
+    order, value = ordering[0], position[0]
+    field = order.lstrip('-')
+    lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+    after = Q(**{'{}__{}'.format(field, lookup): value})
+    if len(ordering) == 1:
+        return after
+
+    following = Q(**{field: value}) & keyset_filter(ordering[1:], position[1:], reverse)
+    return Q(**{'{}__{}e'.format(field, lookup): value}) & (after | following)
+
+
+class IdCursorPagination(CursorPagination):
+    '''
+    Keyset pagination ordered by primary key
+
+    Each page is fetched with `WHERE id > <cursor> ORDER BY id LIMIT n`, so
+    later pages cost the same as the first one and no `COUNT(*)` is needed.
+    Clients can ask for a different page size with `?page_size=`, up to
+    `MAX_PAGE_SIZE`.
+
+    With other orderings (which always end with `id`, see
+    `StableOrderingFilter`), the cursor holds the values of every ordering
+    field, so pages still start with a `WHERE` on those fields. DRF's own
+    cursors only hold the first field, and fall back to `OFFSET` when it
+    isn't unique.
+    '''
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor and self.cursor.position
+        if position is not None:
+            position = self.decode_position(position)
+            queryset = queryset.filter(keyset_filter(self.ordering, position, reverse))
+
+        if reverse:
+            queryset = queryset.order_by(*[
+                order[1:] if order.startswith('-') else '-' + order for order in self.ordering
+            ])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # Positions are unique, so cursors never need an offset
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > self.page_size:
+            following = self._get_position_from_instance(results[-1], self.ordering)
+        if reverse:
+            self.page.reverse()
+
+        current = self.cursor and self.cursor.position
+        self.next_position, self.previous_position = (current, following) if reverse else (following, current)
+        self.has_next = self.next_position is not None
+        self.has_previous = self.previous_position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            values.append(six.text_type(value))
+        return json.dumps(values, separators=(',', ':'))
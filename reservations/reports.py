@@ -0,0 +1,94 @@
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+
+from core import db
+
+from reservations.models import Reservation, Room
+from reservations.versioning import get_version
+
+OCCUPANCY_SQL = '''
+    SELECT COUNT(reservation.id)
+    FROM generate_series(%(start)s::date, %(end)s::date, interval '1 day') AS days(day)
+    LEFT JOIN {reservation} AS reservation
+        ON reservation.start_date <= days.day
+        AND reservation.end_date >= days.day
+        AND reservation.room_id IN (SELECT id FROM {room} WHERE destination_id = %(destination)s)
+    GROUP BY days.day
+    ORDER BY days.day
+'''.format(reservation=Reservation._meta.db_table, room=Room._meta.db_table)
+
+
+def daily_occupancy_sql(destination_id, start, end):
+    '''
+    Occupied rooms per day, counted by the database against a generated
+    series of days (PostgreSQL only)
+    '''
+    with connections[router.db_for_read(Reservation)].cursor() as cursor:
+        cursor.execute(OCCUPANCY_SQL, {'destination': destination_id, 'start': start, 'end': end})
+        return [count for count, in cursor.fetchall()]
+
+
+def daily_occupancy_numpy(destination_id, start, end):
+    '''
+    Occupied rooms per day, counted in-process from the overlapping stays
+
+    Each stay adds one at its first day and subtracts one after its last day
+    (clipped to the window); a cumulative sum then gives the daily counts.
+    '''
+    days = (end - start).days + 1
+    stays = np.array(list(
+        Reservation.objects.overlapping(start, end).filter(
+            room__destination_id=destination_id
+        ).values_list('start_date', 'end_date')
+    ), dtype='datetime64[D]').reshape(-1, 2)
+
+    offsets = (stays - np.datetime64(start, 'D')).astype(np.int64)
+    first = np.clip(offsets[:, 0], 0, days)
+    after_last = np.clip(offsets[:, 1] + 1, 0, days)
+
+    changes = np.zeros(days + 1, dtype=np.int64)
+    np.add.at(changes, first, 1)
+    np.add.at(changes, after_last, -1)
+    return np.cumsum(changes[:days]).tolist()
+
+
+def daily_occupancy(destination_id, start, end):
+    if connections[router.db_for_read(Reservation)].vendor == 'postgresql':
+        return daily_occupancy_sql(destination_id, start, end)
+    return daily_occupancy_numpy(destination_id, start, end)
+
+
+def occupancy_report(destination, start, end):
+    '''
+    Daily occupancy of a destination between two dates (inclusive)
+
+    Returned in columnar form: one `dates` list and matching `occupied` and
+    `available` room counts. Reports are cached until a reservation or room
+    changes, but only when read from the primary: a replica may not have
+    caught up with the current versions yet.
+    '''
+    key = 'occupancy_{}_{}_{}_{}_{}'.format(
+        destination.id, start.isoformat(), end.isoformat(),
+        get_version(Reservation)[0], get_version(Room)[0],
+    )
+    report = cache.get(key)
+    if report is not None:
+        return report
+
+    rooms = destination.rooms.count()
+    occupied = daily_occupancy(destination.id, start, end)
+    report = {
+        'destination': destination.id,
+        'rooms': rooms,
+        'dates': [(start + datetime.timedelta(days=day)).isoformat() for day in range(len(occupied))],
+        'occupied': occupied,
+        'available': [rooms - count for count in occupied],
+    }
+
+    if db.get_replica() is None:
+        cache.set(key, report, settings.REPORT_CACHE_TIMEOUT)
+    return report
@@ -1,9 +1,37 @@
-from django.db.models import Q
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import qs_exists
 
-from reservations.models import Customer, Destination, Reservation, Room
+from core import metrics
+from reservations.models import (
+    ArchivedReservation, Customer, Destination, Reservation, Room
+)
+
+
+CONFLICT_MESSAGE = 'Conflicting reservation exists for this room and date range.'
+
+
+@contextmanager
+def reservation_conflict_errors():
+    '''
+    Turn database overlap constraint violations into validation errors
+
+    The validator below catches most conflicts, but two concurrent requests
+    can both pass it; the database constraint rejects the second insert, and
+    this reports it the same way the validator would.
+    '''
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as e:
+        if Reservation.OVERLAP_CONSTRAINT not in str(e):
+            raise
+        raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [CONFLICT_MESSAGE]})
 
 
 class OrderedDateValidator(object):
@@ -48,26 +76,155 @@ class UniqueForDateRangeValidator(object):
         start = value.get('start_date', start)
         end = value.get('end_date', end)
 
-        overlap_q = (
-            Q(start_date__lte=start, end_date__gte=start) |
-            Q(start_date__lte=end, end_date__gte=end) |
-            Q(start_date__lte=start, end_date__gte=end) |
-            Q(start_date__gte=start, end_date__lte=end)
-        )
-        queryset = Reservation.objects.filter(overlap_q, room=room)
+        queryset = Reservation.objects.overlapping(start, end).filter(room=room)
 
         # Exclude current instance if updating an existing range
         if self.instance is not None:
             queryset = queryset.exclude(id=self.instance.id)
 
         if qs_exists(queryset):
-            raise serializers.ValidationError('Conflicting reservation exists for this room and date range.')
+            raise serializers.ValidationError(CONFLICT_MESSAGE)
 
     def set_context(self, serializer):
         self.instance = getattr(serializer, 'instance', None)
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class DateRangeSerializer(serializers.Serializer):
+    '''
+    Inclusive date range given as `start` and `end` query parameters
+    '''
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, data):
+        if data['end'] < data['start']:
+            raise serializers.ValidationError('Invalid dates. Start date must come before end date.')
+        return data
+
+
+class ReportDateRangeSerializer(DateRangeSerializer):
+    '''
+    Date range for reports, limited to `MAX_REPORT_DAYS`
+    '''
+    def validate(self, data):
+        data = super(ReportDateRangeSerializer, self).validate(data)
+        if (data['end'] - data['start']).days + 1 > settings.MAX_REPORT_DAYS:
+            raise serializers.ValidationError('Date range can cover at most {} days.'.format(settings.MAX_REPORT_DAYS))
+        return data
+
+
+class BulkReservationSerializer(serializers.Serializer):
+    '''
+    Single row of a bulk reservation request
+
+    Customer and room are plain ids here; they are looked up for the whole
+    batch at once instead of with one query per row.
+    '''
+    customer = serializers.IntegerField()
+    room = serializers.IntegerField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    class Meta:
+        validators = [
+            OrderedDateValidator(),
+        ]
+
+
+class ReservationFilterSerializer(serializers.Serializer):
+    '''
+    Query parameters filtering reservation lists
+
+    `start` and `end` select reservations overlapping that range; either
+    can be left out for an open-ended range. `arrival` and `departure`
+    select reservations starting or ending on a date.
+    '''
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    room = serializers.IntegerField(required=False)
+    customer = serializers.IntegerField(required=False)
+    destination = serializers.IntegerField(required=False)
+    arrival = serializers.DateField(required=False)
+    departure = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if 'start' in data and 'end' in data and data['end'] < data['start']:
+            raise serializers.ValidationError('Invalid dates. Start date must come before end date.')
+        return data
+
+
+class ArchivedReservationFilterSerializer(serializers.Serializer):
+    '''
+    Query parameters filtering archived reservation lists
+    '''
+    customer = serializers.IntegerField(required=False)
+    room = serializers.IntegerField(required=False)
+
+
+class ReservationExportSerializer(ReservationFilterSerializer):
+    '''
+    Query parameters for the reservation export: the list filters and the
+    output format
+    '''
+    output = serializers.ChoiceField(choices=('ndjson', 'csv'), default='ndjson')
+
+
+class TimedSerializerMixin(object):
+    '''
+    Count time spent serializing towards the request's metrics
+    '''
+    def to_representation(self, instance):
+        return metrics.time_serialization(super(TimedSerializerMixin, self).to_representation, instance)
+
+
+class ExpandableFieldsMixin(object):
+    '''
+    Inline related objects listed in the serializer context's `expand`
+
+    `expandable_fields` maps related fields to the serializer used to inline
+    them. Paths such as `room.destination` expand fields of the inlined
+    object in turn. Expansion only affects output; input still uses ids.
+    '''
+    expandable_fields = {}
+
+    @classmethod
+    def get_expandable_paths(cls):
+        paths = set()
+        for field_name, serializer_class in cls.expandable_fields.items():
+            paths.add(field_name)
+            for path in getattr(serializer_class, 'get_expandable_paths', set)():
+                paths.add('{}.{}'.format(field_name, path))
+        return paths
+
+    def get_expanded_serializer(self, field_name):
+        '''
+        Serializer for an expanded field, created once per serializer
+        (rather than once per object) when serializing lists
+        '''
+        if not hasattr(self, '_expanded_serializers'):
+            self._expanded_serializers = {}
+
+        if field_name not in self._expanded_serializers:
+            prefix = field_name + '.'
+            context = dict(self.context, expand={
+                path[len(prefix):] for path in self.context.get('expand', ()) if path.startswith(prefix)
+            })
+            self._expanded_serializers[field_name] = self.expandable_fields[field_name](context=context)
+
+        return self._expanded_serializers[field_name]
+
+    def to_representation(self, instance):
+        data = super(ExpandableFieldsMixin, self).to_representation(instance)
+
+        for field_name in self.expandable_fields:
+            if field_name in self.context.get('expand', ()):
+                related = getattr(instance, field_name)
+                data[field_name] = self.get_expanded_serializer(field_name).to_representation(related)
+
+        return data
+
+
+class CustomerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = (
@@ -75,9 +232,35 @@ class CustomerSerializer(serializers.ModelSerializer):
         )
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+class DestinationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Destination
+        fields = (
+            'id', 'name', 'address_1', 'address_2', 'city', 'state', 'zip'
+        )
+
+
+class RoomSerializer(TimedSerializerMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'destination': DestinationSerializer,
+    }
+
+    class Meta:
+        model = Room
+        fields = ('id', 'number', 'destination')
+
+
+class ReservationSerializer(TimedSerializerMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     status = serializers.SerializerMethodField()
 
+    expandable_fields = {
+        'customer': CustomerSerializer,
+        'room': RoomSerializer,
+    }
+
+    # Provided by `ReservationQuerySet.with_status` for fast list reads
+    annotated_fields = ('status',)
+
     def get_status(self, obj):
         '''
         Check-in status for each reservation.
@@ -85,13 +268,15 @@ class ReservationSerializer(serializers.ModelSerializer):
         Returns a `status` for each reservation (pending, in_house, or checked_out),
         depending on whether today's date falls in range of reservation.
         '''
-        today = timezone.now().date()
-        if today < obj.start_date:
-            return 'pending'
-        elif obj.start_date <= today <= obj.end_date:
-            return 'in_house'
-        else:
-            return 'checked_out'
+        return Reservation.status_for(obj.start_date, obj.end_date, timezone.now().date())
+
+    def create(self, validated_data):
+        with reservation_conflict_errors():
+            return super(ReservationSerializer, self).create(validated_data)
+
+    def update(self, instance, validated_data):
+        with reservation_conflict_errors():
+            return super(ReservationSerializer, self).update(instance, validated_data)
 
     class Meta:
         model = Reservation
@@ -102,15 +287,7 @@ class ReservationSerializer(serializers.ModelSerializer):
         ]
 
 
-class RoomSerializer(serializers.ModelSerializer):
+class ArchivedReservationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
-        model = Room
-        fields = ('id', 'number', 'destination')
-
-
-class DestinationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Destination
-        fields = (
-            'id', 'name', 'address_1', 'address_2', 'city', 'state', 'zip'
-        )
+        model = ArchivedReservation
+        fields = ('id', 'customer', 'room', 'start_date', 'end_date')
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from reservations import occupancy, sync
+from reservations.models import (
+    ArchivedReservation, Customer, Destination, Reservation, Room
+)
+from reservations.versioning import collection_changed
+
+
+def connect_signals():
+    for model in (ArchivedReservation, Customer, Destination, Reservation, Room):
+        for signal in (post_save, post_delete):
+            signal.connect(
+                collection_changed,
+                sender=model,
+                dispatch_uid='collection_changed_{}'.format(model._meta.label_lower)
+            )
+
+    # Tombstones for delta sync
+    for model in (Customer, Destination, Reservation, Room):
+        post_delete.connect(
+            sync.record_deletion,
+            sender=model,
+            dispatch_uid='record_deletion_{}'.format(model._meta.label_lower)
+        )
+
+    # Keep this process's occupancy index up to date
+    pre_save.connect(occupancy.reservation_pre_save, sender=Reservation, dispatch_uid='occupancy_pre_save')
+    post_save.connect(occupancy.reservation_saved, sender=Reservation, dispatch_uid='occupancy_saved')
+    post_delete.connect(occupancy.reservation_deleted, sender=Reservation, dispatch_uid='occupancy_deleted')
+    for signal in (post_save, post_delete):
+        signal.connect(occupancy.rooms_changed, sender=Room, dispatch_uid='occupancy_rooms_changed')
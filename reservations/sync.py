@@ -0,0 +1,179 @@
+'''
+Delta sync: changes to a collection since a client's last sync
+
+Clients keeping a copy of a collection call its `sync/` endpoint with the
+cursor from their previous call, and get back the objects saved and the
+ids of objects deleted since then, so each sync costs as much as what
+changed rather than the whole table.
+
+Changes are read in `(updated_at, id)` order (and deletions in
+`(deleted_at, id)` order from the `Tombstone` log), and the cursor holds
+the position reached in each. Timestamps are taken when an object is
+saved, before its transaction commits, so a change could become visible
+after a client has already read past its timestamp. Only changes older
+than `SYNC_LAG_SECONDS` are returned, giving their transactions that long
+to commit; newer ones are picked up by the next sync.
+'''
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers, status
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from reservations.fastpath import ValuesSerializer
+from reservations.models import Tombstone
+from reservations.pagination import IdCursorPagination
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Deletions this old are no longer kept. Sync the whole collection again.'
+    default_code = 'cursor_expired'
+
+
+def encode_cursor(position):
+    '''
+    Opaque cursor for a `{'changes': [timestamp, id], 'deletions': [timestamp, id]}` position
+    '''
+    data = {name: [timestamp.isoformat(), pk] for name, (timestamp, pk) in position.items()}
+    return base64.urlsafe_b64encode(json.dumps(data, sort_keys=True).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        position = {}
+        for name in ('changes', 'deletions'):
+            timestamp, pk = data[name]
+            position[name] = (parse_datetime(timestamp), int(pk))
+            if position[name][0] is None:
+                raise ValueError(timestamp)
+        return position
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeError):
+        raise serializers.ValidationError({'cursor': ['Invalid cursor.']})
+
+
+class SyncParamsSerializer(serializers.Serializer):
+    '''
+    Where to start a sync: the `cursor` returned by the previous one, or
+    `updated_since` a time (for a first sync from a copy made another way)
+    '''
+    cursor = serializers.CharField(required=False)
+    updated_since = serializers.DateTimeField(required=False)
+
+    def validate_cursor(self, value):
+        return decode_cursor(value)
+
+
+def after(queryset, field, timestamp, pk):
+    '''
+    Rows after a `(timestamp, id)` position, in that order
+    '''
+    return queryset.filter(
+        Q(**{field + '__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': pk})
+    ).order_by(field, 'id')
+
+
+def record_deletion(sender, instance, **kwargs):
+    '''
+    `post_delete` receiver adding a tombstone for the deleted object
+    '''
+    Tombstone.objects.create(model=sender._meta.label_lower, object_id=instance.pk)
+
+
+def prune_tombstones():
+    '''
+    Delete tombstones older than `TOMBSTONE_RETENTION_DAYS`, returning how
+    many were deleted
+    '''
+    cutoff = timezone.now() - datetime.timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+class DeltaSyncMixin(object):
+    '''
+    Add a `sync/` endpoint returning the objects changed and deleted since
+    the client's last sync
+
+    The response has the changed objects (serialized like the list) in
+    `results`, the ids of deleted objects in `deleted`, and the `cursor` to
+    pass as `?cursor=` next time. `more` is true if there are more changes
+    to fetch straight away. Without a cursor or `updated_since`, every
+    object is returned (over as many calls as it takes).
+    '''
+    @list_route(methods=['get'])
+    def sync(self, request):
+        params = SyncParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        now = timezone.now()
+        horizon = now - datetime.timedelta(seconds=settings.SYNC_LAG_SECONDS)
+        position = self.get_sync_position(params.validated_data, horizon)
+        if position['deletions'][0] < now - datetime.timedelta(days=settings.TOMBSTONE_RETENTION_DAYS):
+            raise CursorExpired()
+
+        page_size = IdCursorPagination().get_page_size(request)
+        results, position['changes'], more_changes = self.sync_changes(position['changes'], horizon, page_size)
+
+        tombstones = list(after(
+            Tombstone.objects.filter(model=self.get_queryset().model._meta.label_lower, deleted_at__lte=horizon),
+            'deleted_at', *position['deletions']
+        ).values_list('deleted_at', 'id', 'object_id')[:page_size + 1])
+        more_deletions = len(tombstones) > page_size
+        tombstones = tombstones[:page_size]
+        if tombstones:
+            position['deletions'] = tombstones[-1][:2]
+        if not more_deletions and position['deletions'][0] < horizon:
+            # Every tombstone up to the horizon has been returned, and none
+            # is at it (they would be last), so a cursor kept up to date
+            # doesn't expire when nothing is deleted for a while
+            position['deletions'] = (horizon, 0)
+
+        return Response({
+            'results': results,
+            'deleted': [object_id for _, _, object_id in tombstones],
+            'cursor': encode_cursor(position),
+            'more': more_changes or more_deletions,
+        })
+
+    def get_sync_position(self, params, horizon):
+        if 'cursor' in params:
+            return params['cursor']
+        if 'updated_since' in params:
+            return {'changes': (params['updated_since'], 0), 'deletions': (params['updated_since'], 0)}
+
+        # Starting from scratch, so only deletions from now on matter
+        start = datetime.datetime.min.replace(tzinfo=timezone.utc)
+        return {'changes': (start, 0), 'deletions': (horizon, 0)}
+
+    def sync_changes(self, position, horizon, page_size):
+        '''
+        Serialized objects changed after `position` (up to `horizon`), the
+        position of the last one, and whether there are more
+        '''
+        queryset = after(self.get_queryset().filter(updated_at__lte=horizon), 'updated_at', *position)
+
+        values_serializer = ValuesSerializer.for_serializer(self.get_serializer_class())
+        if values_serializer is not None:
+            rows = list(queryset.values(*values_serializer.columns + ['updated_at'])[:page_size + 1])
+            more = len(rows) > page_size
+            rows = rows[:page_size]
+            if rows:
+                position = (rows[-1]['updated_at'], rows[-1]['id'])
+            return values_serializer.to_representation(rows), position, more
+
+        instances = list(queryset[:page_size + 1])
+        more = len(instances) > page_size
+        instances = instances[:page_size]
+        if instances:
+            position = (instances[-1].updated_at, instances[-1].id)
+        return self.get_serializer(instances, many=True).data, position, more
@@ -1,13 +1,121 @@
-from rest_framework.throttling import SimpleRateThrottle
+import math
 
+from rest_framework import throttling
 
-class PerReservationRateThrottle(SimpleRateThrottle):
+from core import metrics
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    '''
+    Rate throttle counting requests over a sliding window
+
+    The throttle duration is split into `buckets` slots, each holding a
+    request counter in the cache. A request atomically increments its slot
+    (`add`/`incr`, so counts are shared correctly between worker processes)
+    and is allowed if the total over the slots in the last `duration`
+    seconds is within the rate. The oldest slot is counted in full, so the
+    window errs on the side of throttling by at most one slot.
+    '''
+    buckets = 10
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.bucket_size = float(self.duration) / self.buckets
+        current = int(self.now // self.bucket_size)
+        window = range(current - self.buckets, current)
+
+        bucket_key = '{}_{}'.format(self.key, current)
+        if self.cache.add(bucket_key, 1, self.duration + self.bucket_size):
+            count = 1
+        else:
+            count = self.cache.incr(bucket_key)
+
+        previous = self.cache.get_many(['{}_{}'.format(self.key, bucket) for bucket in window])
+        history = [(bucket, previous.get('{}_{}'.format(self.key, bucket), 0)) for bucket in window]
+        history.append((current, count))
+        total = sum(requests for _, requests in history)
+
+        self.oldest_bucket = next((bucket for bucket, requests in history if requests), current)
+        self.remaining = max(self.num_requests - total, 0)
+
+        if total > self.num_requests:
+            # Rejected requests don't count towards the limit
+            self.cache.decr(bucket_key)
+            self.record_limits(request)
+            metrics.record_throttle(self.scope)
+            return self.throttle_failure()
+
+        self.record_limits(request)
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def reset_time(self):
+        '''
+        Seconds until the oldest counted request leaves the window
+        '''
+        return max((self.oldest_bucket + 1) * self.bucket_size + self.duration - self.now, 0)
+
+    def wait(self):
+        return self.reset_time()
+
+    def record_limits(self, request):
+        '''
+        Keep the most restrictive limit seen for this request for the
+        rate limit response headers
+        '''
+        limits = getattr(request, 'rate_limits', None)
+        if limits is None or self.remaining < limits['remaining']:
+            request.rate_limits = {
+                'limit': self.num_requests,
+                'remaining': self.remaining,
+                'reset': int(math.ceil(self.reset_time())),
+            }
+
+
+class AnonRateThrottle(SlidingWindowRateThrottle, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(SlidingWindowRateThrottle, throttling.UserRateThrottle):
+    pass
+
+
+class PerReservationRateThrottle(SlidingWindowRateThrottle):
     scope = 'per_reservation'
 
     def get_cache_key(self, request, view):
         '''
         Create cache key in format of throttle_per_reservation_<id> each
         time a reservation object is throttled.
+
+        The id comes from the URL, so no query is needed to build the key.
         '''
-        obj = view.get_object()
-        return 'throttle_per_reservation_{}'.format(obj.id)
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        if lookup_url_kwarg not in view.kwargs:
+            return None
+        return 'throttle_per_reservation_{}'.format(view.kwargs[lookup_url_kwarg])
+
+
+class RateLimitHeadersMixin(object):
+    '''
+    Add `X-RateLimit-*` headers from the view's throttles to every response
+    '''
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(RateLimitHeadersMixin, self).finalize_response(request, response, *args, **kwargs)
+
+        limits = getattr(request, 'rate_limits', None)
+        if limits is not None:
+            response['X-RateLimit-Limit'] = limits['limit']
+            response['X-RateLimit-Remaining'] = limits['remaining']
+            response['X-RateLimit-Reset'] = limits['reset']
+
+        return response
@@ -0,0 +1,44 @@
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(model):
+    return 'collection_version_{}'.format(model._meta.label_lower)
+
+
+def new_version():
+    return (uuid.uuid4().hex, time.time())
+
+
+def get_version(model):
+    '''
+    Current version of a model's collection, as a (token, last modified
+    timestamp) tuple
+
+    The token changes whenever an object of the model is saved or deleted,
+    so it can be used as a validator for anything built from the table.
+    '''
+    version = cache.get(version_key(model))
+    if version is None:
+        # Nothing recorded yet (or evicted), so start a new version
+        cache.add(version_key(model), new_version(), None)
+        version = cache.get(version_key(model))
+    return version
+
+
+def bump_version(model):
+    cache.set(version_key(model), new_version(), None)
+
+
+def collection_changed(sender, **kwargs):
+    '''
+    Signal receiver bumping the version of the sender's collection
+
+    The version is bumped again once the transaction commits, so anything
+    cached from a read made while the change was uncommitted is invalidated.
+    '''
+    bump_version(sender)
+    transaction.on_commit(lambda: bump_version(sender))
@@ -1,38 +1,298 @@
-from rest_framework import viewsets
+import hashlib
 
-from reservations.models import Customer, Destination, Reservation, Room
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers, viewsets
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.response import Response
+
+from core import db
+from reservations import occupancy
+from reservations.bulk import bulk_create_reservations
+from reservations.calendars import destination_calendar
+from reservations.export import export_response
+from reservations.fastpath import ValuesSerializer
+from reservations.filters import (
+    ArchivedReservationFilter, CustomerSearchFilter, filter_reservations,
+    ReservationFilter, ReservationStatusFilter, StableOrderingFilter
+)
+from reservations.idempotency import has_stored_response, IdempotencyMixin
+from reservations.models import (
+    ArchivedReservation, Customer, Destination, Reservation, Room
+)
+from reservations.reports import occupancy_report
 from reservations.serializers import (
-    CustomerSerializer, DestinationSerializer, ReservationSerializer,
-    RoomSerializer
+    ArchivedReservationSerializer, CustomerSerializer, DateRangeSerializer,
+    DestinationSerializer, ReportDateRangeSerializer,
+    ReservationExportSerializer, ReservationSerializer, RoomSerializer
+)
+from reservations.sync import DeltaSyncMixin
+from reservations.throttling import (
+    PerReservationRateThrottle, RateLimitHeadersMixin
 )
-from reservations.throttling import PerReservationRateThrottle
+from reservations.versioning import get_version
+
+
+class ConditionalGetMixin(object):
+    '''
+    ETag/Last-Modified support for list and detail views
+
+    Validators are built from the version tokens of `conditional_models`
+    (every model the view's output can include), which are kept in the
+    cache and change whenever one of those tables does. Requests with a
+    matching `If-None-Match` or `If-Modified-Since` get a 304 before any
+    database query or serialization happens.
+
+    Versions change when the primary commits, and a replica may not have
+    caught up yet, so responses read from a replica carry no validators
+    (they could label stale content with the new version). Validators
+    from earlier primary responses still get 304s from replicas.
+    '''
+    conditional_models = ()
+
+    # Set for views whose output also depends on the current date
+    varies_by_date = False
+
+    def get_validators(self, request):
+        versions = [get_version(model) for model in self.conditional_models]
+        parts = [token for token, _ in versions]
+        parts.extend([request.get_full_path(), request.META.get('HTTP_ACCEPT', '')])
+        last_modified = max(modified for _, modified in versions)
+
+        if self.varies_by_date:
+            today = timezone.localtime(timezone.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+            parts.append(today.date().isoformat())
+            last_modified = max(last_modified, today.timestamp())
+
+        etag = quote_etag(hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest())
+        return etag, int(last_modified)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200 or db.get_replica() is not None:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        handler = super(ConditionalGetMixin, self).list
+        return self.conditional_response(handler, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        handler = super(ConditionalGetMixin, self).retrieve
+        return self.conditional_response(handler, request, *args, **kwargs)
+
+
+class ExpandMixin(object):
+    '''
+    Support `?expand=` for serializers using `ExpandableFieldsMixin`
+
+    Expanded relations are added to the queryset with `select_related`, so
+    expanding a list costs no extra queries per object.
+    '''
+    def get_expand(self):
+        request = getattr(self, 'request', None)
+        if request is None or not request.query_params.get('expand'):
+            return set()
+
+        expand = {path.strip() for path in request.query_params['expand'].split(',') if path.strip()}
+        allowed = self.get_serializer_class().get_expandable_paths()
+        if not expand.issubset(allowed):
+            raise serializers.ValidationError({
+                'expand': ['Must be a comma-separated list of: {}.'.format(', '.join(sorted(allowed)))]
+            })
+
+        # Expanding `room.destination` implies expanding `room`
+        for path in list(expand):
+            parts = path.split('.')
+            expand.update('.'.join(parts[:depth]) for depth in range(1, len(parts)))
+        return expand
+
+    def get_queryset(self):
+        queryset = super(ExpandMixin, self).get_queryset()
+
+        expand = self.get_expand()
+        if expand:
+            queryset = queryset.select_related(*[path.replace('.', '__') for path in expand])
+        return queryset
+
+    def get_serializer_context(self):
+        context = super(ExpandMixin, self).get_serializer_context()
+        context['expand'] = self.get_expand()
+        return context
+
 
+class FastListMixin(object):
+    '''
+    Serve list requests from `values()` rows instead of model instances
 
-class CustomerViewSet(viewsets.ModelViewSet):
+    The output is identical to the regular serializer's. Falls back to the
+    regular path when the serializer isn't supported by `ValuesSerializer`
+    or related objects are being expanded.
+    '''
+    def list(self, request, *args, **kwargs):
+        values_serializer = ValuesSerializer.for_serializer(self.get_serializer_class())
+        if values_serializer is None or self.get_serializer_context().get('expand'):
+            return super(FastListMixin, self).list(request, *args, **kwargs)
+
+        queryset = values_serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+
+        return Response(values_serializer.to_representation(queryset))
+
+
+class CustomerViewSet(ConditionalGetMixin, FastListMixin, DeltaSyncMixin, RateLimitHeadersMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    conditional_models = (Customer,)
+    filter_backends = (CustomerSearchFilter,)
 
 
-class DestinationViewSet(viewsets.ModelViewSet):
+class DestinationViewSet(ConditionalGetMixin, FastListMixin, DeltaSyncMixin, RateLimitHeadersMixin,
+                         viewsets.ModelViewSet):
     queryset = Destination.objects.all()
     serializer_class = DestinationSerializer
+    conditional_models = (Destination,)
+
+    @detail_route(methods=['get'])
+    def availability(self, request, pk=None):
+        '''
+        Rooms at this destination that are free for the whole date range
+        given by the `start` and `end` query parameters.
+        '''
+        destination = self.get_object()
+
+        date_range = DateRangeSerializer(data=request.query_params)
+        date_range.is_valid(raise_exception=True)
+
+        free_ids = None
+        if settings.OCCUPANCY_INDEX:
+            free_ids = occupancy.free_rooms(destination.id, **date_range.validated_data)
+
+        if free_ids is None:
+            rooms = destination.rooms.available(**date_range.validated_data)
+        else:
+            rooms = destination.rooms.filter(id__in=free_ids)
+        rooms = rooms.order_by('number')
+        serializer = RoomSerializer(rooms, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @detail_route(methods=['get'])
+    def calendar(self, request, pk=None):
+        '''
+        Bookings of each room at this destination between the `start` and
+        `end` query parameters. Each room's days are given as `spans` of
+        `[number of days, reservation id]`, with `null` for free days.
+        '''
+        destination = self.get_object()
+
+        date_range = ReportDateRangeSerializer(data=request.query_params)
+        date_range.is_valid(raise_exception=True)
+
+        return Response(destination_calendar(destination, **date_range.validated_data))
+
+    @detail_route(methods=['get'])
+    def occupancy(self, request, pk=None):
+        '''
+        Daily occupancy for this destination between the `start` and `end`
+        query parameters, as a `dates` list with matching `occupied` and
+        `available` room counts.
+        '''
+        destination = self.get_object()
 
+        date_range = ReportDateRangeSerializer(data=request.query_params)
+        date_range.is_valid(raise_exception=True)
 
-class ReservationViewSet(viewsets.ModelViewSet):
+        return Response(occupancy_report(destination, **date_range.validated_data))
+
+
+class ReservationViewSet(ConditionalGetMixin, FastListMixin, ExpandMixin, DeltaSyncMixin, IdempotencyMixin,
+                         RateLimitHeadersMixin, viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    conditional_models = (Reservation, Customer, Room, Destination)
+    varies_by_date = True
+    filter_backends = (ReservationFilter, ReservationStatusFilter, StableOrderingFilter)
+    ordering_fields = ('id', 'start_date', 'end_date', 'status')
+    ordering = ('id',)
+
+    def get_queryset(self):
+        queryset = super(ReservationViewSet, self).get_queryset()
+        return queryset.with_status(timezone.now().date())
 
     def get_throttles(self):
         throttles = super(ReservationViewSet, self).get_throttles()
 
         # Add per-object rate limiting throttle if action updates objects
-        # (Bypass for superusers)
-        if not self.request.user.is_superuser and self.request.method in ('PUT', 'PATCH'):
+        # (Bypass for superusers, and for retries that get a stored response
+        # back instead of updating again)
+        updates = self.request.method in ('PUT', 'PATCH')
+        if updates and not self.request.user.is_superuser and not has_stored_response(self.request):
             throttles.append(PerReservationRateThrottle())
 
         return throttles
 
+    @list_route(methods=['post'])
+    def bulk(self, request):
+        '''
+        Create a batch of reservations from a list.
+
+        Rows are checked for conflicts against existing reservations and each
+        other; valid rows are created and the rest are rejected. The response
+        has one result per row, in request order, with either the new `id` or
+        the row's `errors`.
+        '''
+        return self.idempotent_response(self.create_bulk, request)
+
+    def create_bulk(self, request):
+        if not isinstance(request.data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Expected a list of reservations.']})
+        if len(request.data) > settings.MAX_BULK_SIZE:
+            raise serializers.ValidationError({
+                'non_field_errors': ['No more than {} reservations per request.'.format(settings.MAX_BULK_SIZE)]
+            })
+
+        return Response(bulk_create_reservations(request.data))
 
-class RoomViewSet(viewsets.ModelViewSet):
+    @list_route(methods=['get'])
+    def export(self, request):
+        '''
+        Stream every reservation as NDJSON (default) or CSV (`?output=csv`).
+
+        Takes the same filters as the reservation list (`start`, `end`,
+        `arrival`, `departure`, `room`, `customer` and `destination`).
+        '''
+        params = ReservationExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+
+        return export_response(filter_reservations(Reservation.objects.all(), filters), filters['output'])
+
+
+class RoomViewSet(ConditionalGetMixin, FastListMixin, ExpandMixin, DeltaSyncMixin, RateLimitHeadersMixin,
+                  viewsets.ModelViewSet):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
+    conditional_models = (Room, Destination)
+
+
+class ArchivedReservationViewSet(ConditionalGetMixin, FastListMixin, RateLimitHeadersMixin,
+                                 viewsets.ReadOnlyModelViewSet):
+    '''
+    Reservations moved out of the live table by `manage.py archive_reservations`
+    '''
+    queryset = ArchivedReservation.objects.all()
+    serializer_class = ArchivedReservationSerializer
+    conditional_models = (ArchivedReservation,)
+    filter_backends = (ArchivedReservationFilter,)
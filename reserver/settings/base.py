@@ -1,5 +1,8 @@
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 import os
+import tempfile
+
+import dj_database_url
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -31,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -106,26 +111,136 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static/dist')
 ]
 
+# Cache shared by all worker processes (throttling counters etc.)
+# Defaults to a file-based cache on the local machine; point CACHE_BACKEND and
+# CACHE_LOCATION at a cache server (e.g. memcached) when running several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'core.cache.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'reserver-cache')),
+        # Throttle counters (10 per client and window), collection versions and
+        # cached reports. Django's default of 300 entries would drop counters
+        # as soon as a few dozen clients are active.
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    # Responses stored for Idempotency-Key replays, kept apart so they can't
+    # crowd out the entries above
+    'idempotency': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'core.cache.FileBasedCache'),
+        'LOCATION': os.environ.get(
+            'IDEMPOTENCY_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'reserver-idempotency')
+        ),
+        'KEY_PREFIX': 'idempotency',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Users of API tokens, for core.authentication.CachedTokenAuthentication
+    'tokens': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'core.cache.FileBasedCache'),
+        'LOCATION': os.environ.get('TOKEN_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'reserver-tokens')),
+        'KEY_PREFIX': 'tokens',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# How long (in seconds) the user of an API token is cached for. Deleting the
+# token or saving the user clears it straight away.
+TOKEN_CACHE_TIMEOUT = 5 * 60
+
+# How long (in seconds) responses are replayed for requests repeating an
+# Idempotency-Key, how long a repeat waits for the first request to finish,
+# and how long a request can hold its key before another one may take over
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_SECONDS = 10
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+# Directory for the per-process metrics files served at /metrics. Shared by
+# all worker processes on a host; empty it when the server restarts.
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'reserver-metrics'))
+
+# Aliases of read replicas in DATABASES. Safe requests read from one of them;
+# writes and requests by a client that wrote in the last REPLICA_PIN_SECONDS
+# use the primary (`default`) database.
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 10
+
+
+def add_read_replicas(databases):
+    '''
+    Add the read replicas in DATABASE_REPLICA_URLS (comma separated) to
+    `databases` and DATABASE_REPLICAS. Tests use the primary instead.
+    '''
+    urls = filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))
+    for num, url in enumerate(urls, 1):
+        replica = dj_database_url.parse(url, conn_max_age=databases['default']['CONN_MAX_AGE'])
+        replica['TEST'] = {'MIRROR': 'default'}
+        alias = 'replica{}'.format(num)
+        databases[alias] = replica
+        DATABASE_REPLICAS.append(alias)
+
+
+# Check persistent database connections are still usable at the start of
+# each request (see core.db)
+CONN_HEALTH_CHECKS = False
+
 # Django Rest Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'reservations.throttling.AnonRateThrottle',
+        'reservations.throttling.UserRateThrottle'
     ),
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/minute',
-        'user': '1000/minute',
+        'anon': os.environ.get('ANON_THROTTLE_RATE', '100/minute'),
+        'user': os.environ.get('USER_THROTTLE_RATE', '1000/minute'),
         'per_reservation': '1/minute',
-    }
+    },
+    'DEFAULT_PAGINATION_CLASS': 'reservations.pagination.IdCursorPagination',
+    'PAGE_SIZE': 100,
 }
 
+# Largest page size clients can request with `?page_size=`
+MAX_PAGE_SIZE = 1000
+
+# Largest number of reservations accepted by a single bulk create request
+MAX_BULK_SIZE = 1000
+
+# Longest date range (in days) covered by a single occupancy report
+MAX_REPORT_DAYS = 366
+
+# How long (in seconds) occupancy reports stay cached if nothing changes
+REPORT_CACHE_TIMEOUT = 60 * 60
+
+# Answer availability searches from an in-process bitmap of occupied days per
+# room (see reservations.occupancy), covering this many days from today
+OCCUPANCY_INDEX = False
+OCCUPANCY_INDEX_DAYS = 730
+
+# Reservations that ended more than this many days ago are moved to the
+# archive table by `manage.py archive_reservations`
+ARCHIVE_AFTER_DAYS = 365
+
+# Delta sync only returns changes older than SYNC_LAG_SECONDS, so that
+# transactions still in progress when a client syncs aren't skipped (this
+# should be longer than any write transaction takes). Tombstones of deleted
+# objects are kept for TOMBSTONE_RETENTION_DAYS; clients that haven't
+# synced for longer have to start over.
+SYNC_LAG_SECONDS = 10
+TOMBSTONE_RETENTION_DAYS = 30
+
 # Auth/Login Settings
 LOGIN_REDIRECT_URL = 'api-root'
 LOGIN_URL = 'login'
@@ -14,6 +14,8 @@ DATABASES = {
     'default': db
 }
 
+add_read_replicas(DATABASES)
+
 INSTALLED_APPS.extend([
     'debug_toolbar',
 ])
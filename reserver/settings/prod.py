@@ -1,3 +1,33 @@
+import os
+
+import dj_database_url
+
 from .base import *  # noqa
 
 DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost').split(',')
+
+# Keep connections open between requests (per worker thread) instead of
+# connecting for every request
+db = dj_database_url.config(
+    default=os.environ.get('DATABASE_URL'),
+    conn_max_age=int(os.environ.get('CONN_MAX_AGE', 600)),
+)
+DATABASES = {
+    'default': db
+}
+
+add_read_replicas(DATABASES)
+
+# Persistent connections can be dropped by the database or the network while
+# idle, so check them at the start of each request
+CONN_HEALTH_CHECKS = True
+
+# JSON only: the browsable API renders HTML forms for every response
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=(
+        'rest_framework.renderers.JSONRenderer',
+    ),
+)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+'''
+Compare startup time and throughput of the development and production
+server setups
+
+Starts each server in turn (`manage.py runserver` with the dev settings,
+as docker-compose.yml does, and uWSGI with uwsgi.ini and the prod
+settings), measures how long it takes to answer its first request, then
+sends requests to the URL from several threads for a fixed time.
+
+Both servers use the database in DATABASE_URL; migrate it and load some
+data first (e.g. `manage.py load_demo_data --reservations 10000`). The
+user rate throttle is raised for the run so the limits don't skew the
+results.
+
+    python3 scripts/compare_servers.py --token <API token> --url /api/reservations/
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = [
+    ('runserver', 'reserver.settings.dev', [sys.executable, 'manage.py', 'runserver', '--noreload', '0.0.0.0:8000']),
+    ('uwsgi', 'reserver.settings.prod', ['uwsgi', '--ini', 'uwsgi.ini']),
+]
+
+
+def get(url, token, timeout=10):
+    request = Request(url, headers={'Authorization': 'Token {}'.format(token)} if token else {})
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+
+def wait_until_ready(url, token, process, timeout=60):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError('Server exited with status {}'.format(process.returncode))
+        try:
+            get(url, token, timeout=1)
+            return time.perf_counter() - start
+        except (URLError, ConnectionError):
+            time.sleep(0.05)
+    raise RuntimeError('Server did not start within {}s'.format(timeout))
+
+
+def percentile(timings, percent):
+    return timings[max(int(len(timings) * percent / 100.0 + 0.5) - 1, 0)] if timings else None
+
+
+def load_test(url, token, concurrency, duration):
+    timings = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = get(url, token)
+            except (URLError, ConnectionError):
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                timings.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'requests_per_second': round(len(timings) / duration, 1),
+        'statuses': {str(status): count for status, count in statuses.items()},
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p90_ms': round(percentile(timings, 90) * 1000, 2),
+        'p99_ms': round(percentile(timings, 99) * 1000, 2),
+    }
+
+
+def run_server(name, settings_module, command, args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module, USER_THROTTLE_RATE='1000000/minute')
+    env.setdefault('ALLOWED_HOSTS', 'localhost,127.0.0.1')
+    process = subprocess.Popen(
+        command, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = 'http://127.0.0.1:8000' + args.url
+    try:
+        result = {'startup_seconds': round(wait_until_ready(url, args.token, process), 2)}
+        # Warm up before measuring
+        load_test(url, args.token, args.concurrency, 2)
+        result.update(load_test(url, args.token, args.concurrency, args.duration))
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='/api/reservations/', help='path to request')
+    parser.add_argument('--token', default=os.environ.get('API_TOKEN'), help='API token to authenticate with')
+    parser.add_argument('--concurrency', type=int, default=8, help='simultaneous requests')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to send requests for')
+    args = parser.parse_args()
+
+    results = {}
+    for name, settings_module, command in SERVERS:
+        results[name] = run_server(name, settings_module, command, args)
+        print('{}: {}'.format(name, json.dumps(results[name], sort_keys=True)), file=sys.stderr)
+
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
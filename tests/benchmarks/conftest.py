@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+# Results for this session, keyed by test id
+results = OrderedDict()
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as baselines_file:
+        return json.load(baselines_file)
+
+
+def write_json(path, data):
+    with open(path, 'w') as output:
+        json.dump(data, output, indent=2, sort_keys=True)
+        output.write('\n')
+
+
+def percentile(timings, percent):
+    '''
+    Nearest-rank percentile of a sorted list
+    '''
+    index = int(math.ceil(percent / 100.0 * len(timings))) - 1
+    return timings[max(index, 0)]
+
+
+def summarize(timings, queries):
+    '''
+    Query count and timing statistics, in seconds to the microsecond
+    '''
+    timings = sorted(timings)
+    stats = [
+        ('min', timings[0]),
+        ('mean', sum(timings) / len(timings)),
+        ('p50', percentile(timings, 50)),
+        ('p90', percentile(timings, 90)),
+        ('p99', percentile(timings, 99)),
+        ('max', timings[-1]),
+    ]
+    return OrderedDict([('rounds', len(timings)), ('queries', queries)] + [
+        (stat, round(value, 6)) for stat, value in stats
+    ])
+
+
+def find_regressions(result, baseline, tolerance):
+    regressions = []
+    if result['queries'] > baseline['queries']:
+        regressions.append('{} queries, baseline {}'.format(result['queries'], baseline['queries']))
+    if result['p50'] > baseline['p50'] * (1 + tolerance):
+        regressions.append('median {:.2f}ms, baseline {:.2f}ms'.format(
+            result['p50'] * 1000, baseline['p50'] * 1000
+        ))
+    return regressions
+
+
+class Benchmark(object):
+    '''
+    Time repeated calls of a function, counting queries per call
+
+    One untimed warm-up call is made first. The summary is recorded for
+    the session and checked against the stored baseline, if any.
+    '''
+    def __init__(self, name, rounds, baseline=None, tolerance=0):
+        self.name = name
+        self.rounds = rounds
+        self.baseline = baseline
+        self.tolerance = tolerance
+
+    def __call__(self, func):
+        func()
+
+        timings = []
+        queries = 0
+        for _ in range(self.rounds):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+            queries = max(queries, len(captured))
+
+        result = results[self.name] = summarize(timings, queries)
+
+        if self.baseline is not None:
+            regressions = find_regressions(result, self.baseline, self.tolerance)
+            assert not regressions, '{} regressed: {}'.format(self.name, '; '.join(regressions))
+
+        return result
+
+
+def pytest_generate_tests(metafunc):
+    if 'benchmark_size' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('--benchmark-sizes').split(',')]
+        metafunc.parametrize('benchmark_size', sizes, scope='session')
+
+
+@pytest.fixture(scope='session')
+def seeded_db(benchmark_size, django_db_setup, django_db_blocker):
+    '''
+    Database seeded with `benchmark_size` reservations, shared by all
+    benchmarks for that size
+    '''
+    with django_db_blocker.unblock():
+        call_command(
+            'load_demo_data',
+            destinations=max(benchmark_size // 2000, 1),
+            customers=max(benchmark_size // 10, 1),
+            reservations=benchmark_size,
+            seed=1,
+        )
+        yield benchmark_size
+        call_command('flush', interactive=False, verbosity=0)
+
+
+@pytest.fixture
+def benchmark(request):
+    config = request.config
+    name = request.node.name
+    baseline = None if config.getoption('--benchmark-save') else load_baselines().get(name)
+    return Benchmark(
+        name,
+        rounds=config.getoption('--benchmark-rounds'),
+        baseline=baseline,
+        tolerance=config.getoption('--benchmark-tolerance'),
+    )
+
+
+def pytest_sessionfinish(session):
+    if not results:
+        return
+
+    config = session.config
+    path = config.getoption('--benchmark-json')
+    if path:
+        write_json(path, results)
+
+    if config.getoption('--benchmark-save'):
+        baselines = load_baselines()
+        baselines.update(results)
+        write_json(BASELINES_PATH, baselines)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not results:
+        return
+
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line('{:<40} {:>8} {:>10} {:>10} {:>10}'.format(
+        'name', 'queries', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)'
+    ))
+    for name, result in results.items():
+        terminalreporter.write_line('{:<40} {:>8} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            name, result['queries'], result['p50'] * 1000, result['p90'] * 1000, result['p99'] * 1000
+        ))
@@ -0,0 +1,81 @@
+import datetime
+import itertools
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.models import Customer, Reservation, Room
+from reservations.throttling import UserRateThrottle
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+FAR_FUTURE = datetime.date(2100, 1, 1)
+
+
+@pytest.fixture
+def api_client(client, superuser):
+    client.force_authenticate(user=superuser)
+    return client
+
+
+def request(method, url, expected=status.HTTP_200_OK, **kwargs):
+    def call():
+        response = method(url, **kwargs)
+        assert response.status_code == expected
+    return call
+
+
+def test_list(benchmark, api_client, seeded_db):
+    benchmark(request(api_client.get, reverse('reservation-list')))
+
+
+def test_detail(benchmark, api_client, seeded_db):
+    ids = Reservation.objects.order_by('id').values_list('id', flat=True)
+    url = reverse('reservation-detail', args=[ids[seeded_db // 2]])
+
+    benchmark(request(api_client.get, url))
+
+
+def test_create(benchmark, api_client, seeded_db):
+    '''
+    Create non-conflicting reservations on a busy room, so the date range
+    validator has the most rows to check
+    '''
+    customer = Customer.objects.first()
+    room = Room.objects.first()
+    url = reverse('reservation-list')
+    days = itertools.count()
+
+    def create():
+        start = FAR_FUTURE + datetime.timedelta(days=next(days) * 2)
+        data = {'customer': customer.id, 'room': room.id, 'start_date': start, 'end_date': start}
+        request(api_client.post, url, expected=status.HTTP_201_CREATED, data=data)()
+
+    benchmark(create)
+
+
+def test_patch(benchmark, api_client, seeded_db):
+    reservation = Reservation.objects.create(
+        customer=Customer.objects.first(),
+        room=Room.objects.first(),
+        start_date=FAR_FUTURE,
+        end_date=FAR_FUTURE,
+    )
+    url = reverse('reservation-detail', args=[reservation.pk])
+    end_dates = itertools.cycle([FAR_FUTURE + datetime.timedelta(days=1), FAR_FUTURE])
+
+    def patch():
+        request(api_client.patch, url, data={'end_date': next(end_dates)})()
+
+    benchmark(patch)
+
+
+def test_throttle(benchmark, rf, superuser):
+    http_request = rf.get('/')
+    http_request.user = superuser
+
+    def allow():
+        assert UserRateThrottle().allow_request(http_request, None)
+
+    benchmark(allow)
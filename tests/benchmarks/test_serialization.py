@@ -0,0 +1,59 @@
+import datetime
+import time
+
+import pytest
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from reservations.fastpath import ValuesSerializer
+from reservations.models import Reservation
+from reservations.serializers import ReservationSerializer
+
+
+def populate_reservations(customer, rooms, count):
+    '''
+    Non-conflicting reservations spread evenly over the given rooms
+    '''
+    first_day = datetime.date(2018, 1, 1)
+    Reservation.objects.bulk_create(
+        Reservation(
+            customer=customer,
+            room=rooms[num % len(rooms)],
+            start_date=first_day + datetime.timedelta(days=num // len(rooms) * 3),
+            end_date=first_day + datetime.timedelta(days=num // len(rooms) * 3 + 1),
+        )
+        for num in range(count)
+    )
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('count', [10000, 100000])
+@pytest.mark.django_db
+def test_list_serialization(customer, destination, count):
+    '''
+    Compare rendering a full reservation list with the model serializer
+    and with `ValuesSerializer`
+    '''
+    populate_reservations(customer, list(destination.rooms.all()), count)
+    queryset = Reservation.objects.with_status(timezone.now().date()).order_by('id')
+    renderer = JSONRenderer()
+
+    values_serializer = ValuesSerializer.for_serializer(ReservationSerializer)
+    regular_time, regular = timed(
+        lambda: renderer.render(ReservationSerializer(queryset, many=True).data)
+    )
+    fast_time, fast = timed(
+        lambda: renderer.render(values_serializer.to_representation(values_serializer.values(queryset)))
+    )
+
+    print('\n{} reservations: serializer {:.3f}s, values {:.3f}s ({:.1f}x faster)'.format(
+        count, regular_time, fast_time, regular_time / fast_time
+    ))
+    assert fast == regular
+    assert fast_time < regular_time
@@ -1,5 +1,9 @@
+import os
+import sqlite3
+
 import pytest
 from django.contrib.auth.models import AnonymousUser
+from django.db import connection, connections
 from rest_framework.test import APIClient, APIRequestFactory
 
 from reservations.models import Customer, Destination
@@ -13,16 +17,90 @@ def pytest_addoption(parser):
         default=False,
         help='run slow tests'
     )
+    parser.addoption(
+        '--benchmark',
+        action='store_true',
+        default=False,
+        help='run benchmarks'
+    )
+    parser.addoption(
+        '--benchmark-sizes',
+        default='10000',
+        help='comma separated reservation counts to seed for API benchmarks (default: 10000)'
+    )
+    parser.addoption(
+        '--benchmark-rounds',
+        type=int,
+        default=50,
+        help='timed rounds per benchmark (default: 50)'
+    )
+    parser.addoption(
+        '--benchmark-json',
+        metavar='PATH',
+        help='write benchmark results to PATH as JSON'
+    )
+    parser.addoption(
+        '--benchmark-save',
+        action='store_true',
+        default=False,
+        help='store benchmark results as the new baselines'
+    )
+    parser.addoption(
+        '--benchmark-tolerance',
+        type=float,
+        default=0.5,
+        help='fraction a median time may exceed its baseline before failing (default: 0.5)'
+    )
 
 
 def pytest_collection_modifyitems(config, items):
-    if config.getoption('--slow'):
-        return
+    for marker in ('slow', 'benchmark'):
+        option = '--{}'.format(marker)
+        if config.getoption(option):
+            continue
 
-    skip_slow = pytest.mark.skip(reason='need --slow option to run')
-    for item in items:
-        if 'slow' in item.keywords:
-            item.add_marker(skip_slow)
+        skip = pytest.mark.skip(reason='need {} option to run'.format(option))
+        for item in items:
+            if marker in item.keywords:
+                item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(settings, tmpdir_factory):
+    """Give each test empty caches, away from the ones used by the app"""
+    settings.CACHES = {
+        alias: dict(config, LOCATION=str(tmpdir_factory.mktemp('cache-{}'.format(alias))))
+        for alias, config in settings.CACHES.items()
+    }
+
+
+@pytest.fixture
+def lagging_replica(settings, tmpdir):
+    """
+    A `replica1` database behind the primary: it holds a copy of the
+    primary made when the returned function is called (SQLite only)
+    """
+    if connection.vendor != 'sqlite':
+        pytest.skip('Copies the SQLite database')
+
+    path = str(tmpdir.join('replica.sqlite3'))
+    connections.databases['replica1'] = dict(connections.databases['default'], NAME=path)
+    settings.DATABASE_REPLICAS = ['replica1']
+
+    def catch_up():
+        connections['replica1'].close()
+        connection.ensure_connection()
+        if os.path.exists(path):
+            os.remove(path)
+        replica = sqlite3.connect(path)
+        replica.executescript('\n'.join(connection.connection.iterdump()))
+        replica.close()
+
+    yield catch_up
+    connections['replica1'].close()
+    del connections.databases['replica1']
+    if hasattr(connections._connections, 'replica1'):
+        delattr(connections._connections, 'replica1')
 
 
 @pytest.fixture
@@ -0,0 +1,85 @@
+import pickle
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import (
+    CachedTokenAuthentication, get_cache, get_cache_key
+)
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+def authenticate(rf, token):
+    request = rf.get('/', HTTP_AUTHORIZATION='Token {}'.format(token.key))
+    return CachedTokenAuthentication().authenticate(request)
+
+
+@pytest.mark.django_db
+def test_cached_token(rf, user, token):
+    with CaptureQueriesContext(connection) as queries:
+        assert authenticate(rf, token) == (user, token)
+    assert len(queries) == 1
+
+    with CaptureQueriesContext(connection) as queries:
+        cached_user, cached_token = authenticate(rf, token)
+    assert len(queries) == 0
+    assert (cached_user.id, cached_user.username, cached_user.is_active) == (user.id, user.username, True)
+    assert (cached_token.key, cached_token.user) == (token.key, cached_user)
+
+
+@pytest.mark.django_db
+def test_password_is_not_cached(rf, user, token):
+    authenticate(rf, token)
+    cached = pickle.dumps(get_cache().get(get_cache_key(token.key)))
+    assert user.password.encode('utf-8') not in cached
+
+    # The password is deferred, so saving the cached user keeps it
+    cached_user, _ = authenticate(rf, token)
+    cached_user.first_name = 'Changed'
+    cached_user.save()
+    user.refresh_from_db()
+    assert (user.first_name, user.check_password('redcabbage')) == ('Changed', True)
+
+
+@pytest.mark.django_db
+def test_invalid_token_is_not_cached(rf, user):
+    for _ in range(2):
+        with CaptureQueriesContext(connection) as queries, pytest.raises(AuthenticationFailed):
+            authenticate(rf, Token(key='invalid'))
+        assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_deactivated_user(rf, user, token):
+    authenticate(rf, token)
+    user.is_active = False
+    user.save()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(rf, token)
+
+
+@pytest.mark.django_db
+def test_deleted_token(rf, user, token):
+    authenticate(rf, token)
+    token.delete()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(rf, token)
+
+
+@pytest.mark.django_db
+def test_api_token_authentication(client, user, token):
+    client.credentials(HTTP_AUTHORIZATION='Token {}'.format(token.key))
+    for _ in range(2):
+        assert client.get(reverse('customer-list')).status_code == status.HTTP_200_OK
+
+    user.delete()
+    assert client.get(reverse('customer-list')).status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,29 @@
+from core.cache import FileBasedCache
+
+
+def entries(cache):
+    return len(cache._list_cache_files())
+
+
+def test_cull_interval(tmpdir, monkeypatch):
+    cache = FileBasedCache(str(tmpdir), {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}})
+    now = [100.0]
+    monkeypatch.setattr('core.cache.time.time', lambda: now[0])
+
+    # The directory is only checked once per interval, so it can overshoot
+    for num in range(15):
+        cache.set('key{}'.format(num), num)
+    assert entries(cache) == 15
+
+    now[0] += cache.cull_interval
+    cache.set('key15', 15)
+    assert entries(cache) == 9
+
+
+def test_add_and_incr(tmpdir):
+    cache = FileBasedCache(str(tmpdir), {})
+
+    assert cache.add('counter', 1)
+    assert not cache.add('counter', 5)
+    assert cache.incr('counter') == 2
+    assert cache.decr('counter', 2) == 0
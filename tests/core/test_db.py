@@ -0,0 +1,16 @@
+import pytest
+from django.db import connection
+
+from core.db import check_connections
+
+
+@pytest.mark.parametrize('usable,closed', [(True, False), (False, True)])
+@pytest.mark.django_db
+def test_check_connections(monkeypatch, usable, closed):
+    calls = []
+    connection.ensure_connection()
+    monkeypatch.setattr(connection, 'is_usable', lambda: usable)
+    monkeypatch.setattr(connection, 'close', lambda: calls.append('close'))
+
+    check_connections()
+    assert bool(calls) == closed
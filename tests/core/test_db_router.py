@@ -0,0 +1,77 @@
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+
+from core.db import ReplicaRouter
+from core.middleware import ReplicaMiddleware
+from reservations.models import Reservation
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica1']
+    settings.REPLICA_PIN_SECONDS = 10
+
+
+def read_database(rf, method='get', headers=None, **cookies):
+    '''
+    Database the router picks for reads during a request, and the response
+    '''
+    router = ReplicaRouter()
+    seen = []
+
+    def view(request):
+        seen.append(router.db_for_read(Reservation))
+        return HttpResponse()
+
+    request = getattr(rf, method)('/api/reservations/', **(headers or {}))
+    request.COOKIES.update(cookies)
+    response = ReplicaMiddleware(view)(request)
+    return seen[0], response
+
+
+def test_safe_requests_read_from_replica(rf, replicas):
+    assert read_database(rf)[0] == 'replica1'
+    assert read_database(rf, method='head')[0] == 'replica1'
+
+    # Outside of requests everything uses the primary
+    assert ReplicaRouter().db_for_read(Reservation) == 'default'
+
+
+def test_writes_use_primary(rf, replicas):
+    database, response = read_database(rf, method='post')
+    assert database == 'default'
+    assert ReplicaRouter().db_for_write(Reservation, instance=Reservation()) == 'default'
+
+    # Following requests from the same client are pinned to the primary
+    cookie = response.cookies[ReplicaMiddleware.cookie_name]
+    assert cookie['max-age'] == 10
+    assert read_database(rf, **{ReplicaMiddleware.cookie_name: cookie.value})[0] == 'default'
+
+
+def test_pin_expires(rf, replicas):
+    assert read_database(rf, **{ReplicaMiddleware.cookie_name: '1000'})[0] == 'replica1'
+    assert read_database(rf, **{ReplicaMiddleware.cookie_name: 'invalid'})[0] == 'replica1'
+
+
+def test_no_replicas(rf):
+    assert read_database(rf)[0] == 'default'
+
+
+def test_token_clients_are_pinned(rf, replicas):
+    token = {'HTTP_AUTHORIZATION': 'Token abc'}
+    read_database(rf, method='patch', headers=token)
+
+    # Without the cookie, the token pins the client to the primary
+    assert read_database(rf, headers=token)[0] == 'default'
+    assert read_database(rf, headers={'HTTP_AUTHORIZATION': 'Token xyz'})[0] == 'replica1'
+
+
+def test_streamed_responses_read_from_replica(rf, replicas):
+    router = ReplicaRouter()
+
+    def content():
+        yield router.db_for_read(Reservation)
+
+    response = ReplicaMiddleware(lambda request: StreamingHttpResponse(content()))(rf.get('/'))
+    assert list(response.streaming_content) == [b'replica1']
+    assert router.db_for_read(Reservation) == 'default'
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from core import metrics
+from reservations.models import Reservation
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmpdir):
+    settings.METRICS_DIR = str(tmpdir)
+    return settings.METRICS_DIR
+
+
+def scrape(client):
+    response = client.get(reverse('metrics'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'].startswith('text/plain')
+
+    samples = {}
+    for line in response.content.decode('utf-8').splitlines():
+        if not line.startswith('#'):
+            sample, value = line.rsplit(' ', 1)
+            samples[sample] = float(value)
+    return samples
+
+
+@pytest.mark.django_db
+def test_request_metrics(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+    Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-03')
+
+    for _ in range(3):
+        assert client.get(reverse('reservation-list')).status_code == status.HTTP_200_OK
+
+    samples = scrape(client)
+    labels = 'method="GET",route="reservation-list"'
+
+    assert samples['reserver_http_request_duration_seconds_count{{{}}}'.format(labels)] == 3
+    assert samples['reserver_http_request_duration_seconds_bucket{{{},le="+Inf"}}'.format(labels)] == 3
+    assert samples['reserver_http_request_duration_seconds_sum{{{}}}'.format(labels)] > 0
+    assert samples['reserver_http_responses_total{{{},status="200"}}'.format(labels)] == 3
+    assert samples['reserver_db_queries_total{{{}}}'.format(labels)] >= 3
+    assert samples['reserver_db_query_duration_seconds_total{{{}}}'.format(labels)] > 0
+    assert samples['reserver_serializer_duration_seconds_total{{{}}}'.format(labels)] > 0
+
+    # Buckets are cumulative
+    buckets = [value for sample, value in samples.items() if sample.startswith(
+        'reserver_http_request_duration_seconds_bucket{{{}'.format(labels)
+    )]
+    assert buckets == sorted(buckets)
+
+
+@pytest.mark.django_db
+def test_throttle_metrics(client, user, customer, room):
+    client.force_authenticate(user=user)
+    reservation = Reservation.objects.create(
+        customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-03'
+    )
+
+    url = reverse('reservation-detail', args=[reservation.pk])
+    assert client.patch(url, {'end_date': '2018-02-04'}).status_code == status.HTTP_200_OK
+    assert client.patch(url, {'end_date': '2018-02-05'}).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    samples = scrape(client)
+    assert samples[
+        'reserver_throttled_requests_total{method="PATCH",route="reservation-detail",scope="per_reservation"}'
+    ] == 1
+
+
+def test_metrics_aggregate_across_processes(metrics_dir):
+    # Another worker's file
+    other = metrics.MmapedDict(os.path.join(metrics_dir, 'metrics-1.db'))
+    other.inc(metrics.store._key('reserver_db_queries_total', (('method', 'GET'), ('route', 'room-list'))), 2)
+
+    metrics.store.inc([('reserver_db_queries_total', (('method', 'GET'), ('route', 'room-list')), 5)])
+
+    assert 'reserver_db_queries_total{method="GET",route="room-list"} 7.0' in metrics.render().splitlines()
+
+
+def test_mmaped_dict_grows_and_reopens(tmpdir):
+    path = str(tmpdir.join('metrics.db'))
+    values = metrics.MmapedDict(path)
+    keys = ['key-{}'.format(num) * 10 for num in range(1000)]
+    for key in keys:
+        values.inc(key, 1.5)
+    values.inc(keys[0], 1)
+
+    assert os.path.getsize(path) > metrics.MmapedDict.initial_size
+
+    # Values are kept when the file is opened again, e.g. by a restarted worker with the same pid
+    reopened = metrics.MmapedDict(path)
+    reopened.inc(keys[1], 1)
+    assert dict(metrics.read_file(path)) == dict({key: 1.5 for key in keys}, **{keys[0]: 2.5, keys[1]: 2.5})
+
+
+def test_exited_processes_are_merged(metrics_dir):
+    labels = (('method', 'GET'), ('route', 'reservation-list'))
+    metrics.store.inc([('reserver_http_responses_total', labels, 1)])
+
+    # Workers that have exited leave their files behind
+    for _ in range(2):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                metrics.store.inc([('reserver_http_responses_total', labels, 2)])
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+    assert len([name for name in os.listdir(metrics_dir) if name.endswith('.db')]) == 3
+
+    for _ in range(2):
+        assert metrics.collect()[('reserver_http_responses_total', labels)] == 5
+        assert {name for name in os.listdir(metrics_dir) if name.endswith('.db')} == {
+            metrics.AGGREGATE_FILE, 'metrics-{}.db'.format(os.getpid())
+        }
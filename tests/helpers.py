@@ -1,6 +1,10 @@
+import time
+
 from django.contrib.auth import get_user_model
 
+from core.middleware import ReplicaMiddleware
 from reservations.models import Room
+from reservations.versioning import collection_changed
 
 
 def populate_rooms(destination, floors, rooms_per_floor):
@@ -13,13 +17,15 @@ def populate_rooms(destination, floors, rooms_per_floor):
     We are assuming a simple floor model where each floor has the same
     number of rooms
     '''
-    for floor in range(1, floors + 1):
-        for num in range(rooms_per_floor):
-            room_num = floor * 100 + num
-            Room.objects.create(
-                number=room_num,
-                destination=destination
-            )
+    Room.objects.bulk_create(
+        Room(
+            number=floor * 100 + num,
+            destination=destination
+        )
+        for floor in range(1, floors + 1)
+        for num in range(rooms_per_floor)
+    )
+    collection_changed(Room)
 
 
 def create_user(username, email, **kwargs):
@@ -32,3 +38,10 @@ def create_user(username, email, **kwargs):
     user.set_password('redcabbage')
     user.save()
     return user
+
+
+def pin_to_primary(client):
+    '''
+    Have the client's next requests read from the primary, as after a write
+    '''
+    client.cookies[ReplicaMiddleware.cookie_name] = str(time.time() + 10)
@@ -0,0 +1,97 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.six import StringIO
+from rest_framework import status
+
+from reservations.archive import archive_reservations
+from reservations.models import ArchivedReservation, Reservation
+
+
+@pytest.fixture
+def reservations(customer, other_customer, room, other_room):
+    '''
+    Three reservations that ended long ago and one current one
+    '''
+    today = timezone.now().date()
+    day = datetime.timedelta(days=1)
+    return [
+        Reservation.objects.create(customer=customer, room=room, start_date=today - 500 * day,
+                                   end_date=today - 498 * day),
+        Reservation.objects.create(customer=other_customer, room=room, start_date=today - 450 * day,
+                                   end_date=today - 440 * day),
+        Reservation.objects.create(customer=customer, room=other_room, start_date=today - 400 * day,
+                                   end_date=today - 399 * day),
+        Reservation.objects.create(customer=customer, room=room, start_date=today, end_date=today + day),
+    ]
+
+
+@pytest.mark.django_db
+def test_archive_in_batches(reservations):
+    cutoff = timezone.now().date() - datetime.timedelta(days=30)
+    assert list(archive_reservations(cutoff, batch_size=2)) == [2, 1]
+
+    assert list(Reservation.objects.values_list('id', flat=True)) == [reservations[3].id]
+
+    # Archived reservations keep their ids and fields
+    for reservation in reservations[:3]:
+        archived = ArchivedReservation.objects.get(id=reservation.id)
+        assert archived.customer_id == reservation.customer_id
+        assert archived.room_id == reservation.room_id
+        assert archived.start_date == reservation.start_date
+        assert archived.end_date == reservation.end_date
+        assert archived.updated_at == reservation.updated_at
+
+
+@pytest.mark.django_db
+def test_archive_command(reservations):
+    out = StringIO()
+    call_command('archive_reservations', days=420, batch_size=1, stdout=out)
+
+    assert 'Archived 2 reservations' in out.getvalue()
+    assert set(ArchivedReservation.objects.values_list('id', flat=True)) == {
+        reservations[0].id, reservations[1].id
+    }
+
+    # Nothing left to move
+    call_command('archive_reservations', days=420, stdout=out)
+    assert ArchivedReservation.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_archived_reservation_endpoint(client, superuser, reservations, customer, room):
+    client.force_authenticate(user=superuser)
+    list(archive_reservations(timezone.now().date(), batch_size=100))
+
+    response = client.get(reverse('reservation-list'))
+    assert [item['id'] for item in response.data['results']] == [reservations[3].id]
+
+    response = client.get(reverse('archivedreservation-list'), {'customer': customer.id, 'room': room.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert [item['id'] for item in response.data['results']] == [reservations[0].id]
+    assert response.data['results'][0]['start_date'] == reservations[0].start_date.isoformat()
+
+    response = client.get(reverse('archivedreservation-detail', args=[reservations[1].id]))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['customer'] == reservations[1].customer_id
+
+    # Read-only
+    response = client.delete(reverse('archivedreservation-detail', args=[reservations[1].id]))
+    assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    response = client.get(reverse('archivedreservation-list'), {'room': 'abc'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_archive_changes_etag(client, superuser, reservations):
+    client.force_authenticate(user=superuser)
+    etag = client.get(reverse('reservation-list'))['ETag']
+
+    list(archive_reservations(timezone.now().date(), batch_size=100))
+
+    response = client.get(reverse('reservation-list'), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
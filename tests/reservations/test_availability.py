@@ -0,0 +1,94 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.models import Destination, Reservation, Room
+
+
+@pytest.fixture
+def reservation(customer, room):
+    return Reservation.objects.create(
+        customer=customer,
+        room=room,
+        start_date='2018-02-02',
+        end_date='2018-02-04',
+    )
+
+
+def get_available_ids(client, destination, start, end):
+    url = reverse('destination-availability', args=[destination.pk])
+    response = client.get(url, {'start': start, 'end': end})
+    assert response.status_code == status.HTTP_200_OK
+    return {room['id'] for room in response.data}
+
+
+@pytest.mark.parametrize('start,end', [
+    ('2018-02-01', '2018-02-02'),  # Ends on reservation start date
+    ('2018-02-04', '2018-02-05'),  # Starts on reservation end date
+    ('2018-02-03', '2018-02-03'),  # Inside reservation
+    ('2018-02-01', '2018-02-05'),  # Surrounds reservation
+])
+@pytest.mark.django_db
+def test_booked_room_not_available(client, superuser, destination, room, reservation, start, end):
+    client.force_authenticate(user=superuser)
+
+    available = get_available_ids(client, destination, start, end)
+
+    assert room.id not in available
+    assert available == set(destination.rooms.exclude(id=room.id).values_list('id', flat=True))
+
+
+@pytest.mark.django_db
+def test_room_available_outside_reservation(client, superuser, destination, room, reservation):
+    client.force_authenticate(user=superuser)
+
+    assert room.id in get_available_ids(client, destination, '2018-02-05', '2018-02-10')
+    assert room.id in get_available_ids(client, destination, '2018-01-20', '2018-02-01')
+
+
+@pytest.mark.django_db
+def test_availability_only_lists_destination_rooms(client, superuser, destination, reservation):
+    client.force_authenticate(user=superuser)
+
+    # Rooms from another destination should never be returned
+    other_destination = Destination.objects.create(
+        name='Other Hotel',
+        address_1='456 Fake St',
+        city='Los Angeles',
+        state='CA',
+        zip='90210'
+    )
+    other_room = Room.objects.create(number=101, destination=other_destination)
+
+    available = get_available_ids(client, destination, '2018-02-01', '2018-02-05')
+    assert other_room.id not in available
+
+
+@pytest.mark.django_db
+def test_availability_query_count(client, superuser, destination, reservation):
+    client.force_authenticate(user=superuser)
+    url = reverse('destination-availability', args=[destination.pk])
+
+    # One query for the destination, one for the room anti-join
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, {'start': '2018-02-01', 'end': '2018-02-05'})
+    assert response.status_code == status.HTTP_200_OK
+
+    room_queries = [q for q in queries if 'reservations_room' in q['sql']]
+    assert len(room_queries) == 1
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'start': '2018-02-01'},
+    {'start': 'not-a-date', 'end': '2018-02-05'},
+    {'start': '2018-02-05', 'end': '2018-02-01'},
+])
+@pytest.mark.django_db
+def test_availability_invalid_dates(client, superuser, destination, params):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('destination-availability', args=[destination.pk]), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
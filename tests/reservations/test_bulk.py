@@ -0,0 +1,139 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from reservations import bulk
+from reservations.models import Reservation
+from reservations.serializers import CONFLICT_MESSAGE
+
+
+def reservation_data(customer, room, start, end):
+    return {
+        'customer': customer.id,
+        'room': room.id,
+        'start_date': start,
+        'end_date': end,
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_create(client, superuser, customer, room, other_room):
+    client.force_authenticate(user=superuser)
+
+    data = [
+        reservation_data(customer, room, '2018-02-01', '2018-02-03'),
+        reservation_data(customer, room, '2018-02-04', '2018-02-05'),
+        reservation_data(customer, other_room, '2018-02-01', '2018-02-05'),
+    ]
+    response = client.post(reverse('reservation-bulk'), data, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+    # Results come back in request order
+    assert len(response.data) == 3
+    for row, result in zip(data, response.data):
+        reservation = Reservation.objects.get(id=result['id'])
+        assert reservation.room_id == row['room']
+        assert reservation.start_date == parse_date(row['start_date'])
+
+
+@pytest.mark.django_db
+def test_bulk_create_conflicts(client, superuser, customer, room, other_room):
+    client.force_authenticate(user=superuser)
+
+    existing = Reservation.objects.create(
+        customer=customer,
+        room=room,
+        start_date='2018-02-10',
+        end_date='2018-02-12',
+    )
+
+    data = [
+        reservation_data(customer, room, '2018-02-12', '2018-02-14'),  # Conflicts with existing
+        reservation_data(customer, other_room, '2018-02-03', '2018-02-05'),
+        reservation_data(customer, other_room, '2018-02-01', '2018-02-03'),  # Conflicts with previous row
+        reservation_data(customer, room, '2018-02-01', '2018-02-09'),
+    ]
+    response = client.post(reverse('reservation-bulk'), data, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+    conflict = {'errors': {'non_field_errors': [CONFLICT_MESSAGE]}}
+    assert response.data[0] == conflict
+    assert 'id' in response.data[1]
+    assert response.data[2] == conflict
+    assert 'id' in response.data[3]
+
+    assert set(Reservation.objects.values_list('id', flat=True)) == {
+        existing.id, response.data[1]['id'], response.data[3]['id']
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_create_concurrent_conflict(client, superuser, customer, room, other_room, monkeypatch):
+    client.force_authenticate(user=superuser)
+    insert_reservations = bulk.insert_reservations
+
+    def concurrent_insert(rows):
+        # Another request books the room between the check and the insert,
+        # so the database constraint rejects the batch
+        monkeypatch.setattr(bulk, 'insert_reservations', insert_reservations)
+        Reservation.objects.create(customer=customer, room=room, start_date='2018-02-02', end_date='2018-02-02')
+        raise ValidationError({'non_field_errors': [CONFLICT_MESSAGE]})
+
+    monkeypatch.setattr(bulk, 'insert_reservations', concurrent_insert)
+    data = [
+        reservation_data(customer, room, '2018-02-01', '2018-02-03'),
+        reservation_data(customer, other_room, '2018-02-01', '2018-02-03'),
+    ]
+    response = client.post(reverse('reservation-bulk'), data, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data[0] == {'errors': {'non_field_errors': [CONFLICT_MESSAGE]}}
+    assert Reservation.objects.get(id=response.data[1]['id']).room_id == other_room.id
+
+
+@pytest.mark.django_db
+def test_bulk_create_invalid_rows(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+
+    data = [
+        reservation_data(customer, room, '2018-02-05', '2018-02-01'),  # Dates out of order
+        {'customer': 0, 'room': room.id, 'start_date': '2018-02-01', 'end_date': '2018-02-02'},
+        {'customer': customer.id},
+        reservation_data(customer, room, '2018-02-01', '2018-02-02'),
+    ]
+    response = client.post(reverse('reservation-bulk'), data, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+    assert 'non_field_errors' in response.data[0]['errors']
+    assert 'customer' in response.data[1]['errors']
+    assert set(response.data[2]['errors']) == {'room', 'start_date', 'end_date'}
+    assert Reservation.objects.get().id == response.data[3]['id']
+
+
+@pytest.mark.django_db
+def test_bulk_create_requires_list(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+
+    data = reservation_data(customer, room, '2018-02-01', '2018-02-02')
+    response = client.post(reverse('reservation-bulk'), data, format='json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Reservation.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_create_query_count(client, superuser, customer, destination):
+    client.force_authenticate(user=superuser)
+
+    def count_queries(rooms):
+        data = [reservation_data(customer, room, '2018-02-01', '2018-02-02') for room in rooms]
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('reservation-bulk'), data, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries)
+
+    rooms = list(destination.rooms.all())
+    assert count_queries(rooms[:5]) == count_queries(rooms[5:105])
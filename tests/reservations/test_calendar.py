@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.calendars import room_spans
+from reservations.models import Reservation
+from tests.helpers import pin_to_primary
+
+
+@pytest.fixture
+def reservations(customer, destination):
+    rooms = destination.rooms.order_by('number')[:2]
+    return [
+        Reservation.objects.create(customer=customer, room=rooms[0], start_date='2018-01-25', end_date='2018-02-02'),
+        Reservation.objects.create(customer=customer, room=rooms[0], start_date='2018-02-04', end_date='2018-02-04'),
+        Reservation.objects.create(customer=customer, room=rooms[0], start_date='2018-02-05', end_date='2018-02-06'),
+        Reservation.objects.create(customer=customer, room=rooms[1], start_date='2018-02-09', end_date='2018-03-10'),
+    ]
+
+
+def get_calendar(client, destination, start, end):
+    response = client.get(reverse('destination-calendar', args=[destination.pk]), {'start': start, 'end': end})
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+def test_calendar(client, superuser, destination, reservations):
+    client.force_authenticate(user=superuser)
+
+    with CaptureQueriesContext(connection) as queries:
+        calendar = get_calendar(client, destination, '2018-02-01', '2018-02-10')
+    assert len([query for query in queries if 'reservations_reservation' in query['sql']]) == 1
+
+    assert calendar['destination'] == destination.id
+    assert (calendar['start'], calendar['end']) == ('2018-02-01', '2018-02-10')
+
+    # Every room, in number order
+    rooms = list(destination.rooms.order_by('number'))
+    assert [room['id'] for room in calendar['rooms']] == [room.id for room in rooms]
+    assert [room['number'] for room in calendar['rooms']] == [room.number for room in rooms]
+
+    assert calendar['rooms'][0]['spans'] == [
+        [2, reservations[0].id], [1, None], [1, reservations[1].id], [2, reservations[2].id], [4, None]
+    ]
+    assert calendar['rooms'][1]['spans'] == [[8, None], [2, reservations[3].id]]
+    assert all(room['spans'] == [[10, None]] for room in calendar['rooms'][2:])
+
+
+@pytest.mark.django_db
+def test_calendar_cached_until_change(client, superuser, destination, reservations):
+    client.force_authenticate(user=superuser)
+    get_calendar(client, destination, '2018-02-01', '2018-02-10')
+
+    with CaptureQueriesContext(connection) as queries:
+        get_calendar(client, destination, '2018-02-01', '2018-02-10')
+    assert not [query for query in queries if 'reservations_reservation' in query['sql']]
+
+    reservations[3].delete()
+    calendar = get_calendar(client, destination, '2018-02-01', '2018-02-10')
+    assert calendar['rooms'][1]['spans'] == [[10, None]]
+
+
+@pytest.mark.django_db
+def test_calendar_invalid_range(client, superuser, destination, settings):
+    client.force_authenticate(user=superuser)
+    settings.MAX_REPORT_DAYS = 90
+
+    url = reverse('destination-calendar', args=[destination.pk])
+    for params in ({'start': '2018-02-10', 'end': '2018-02-01'}, {'start': '2018-01-01', 'end': '2018-12-31'}, {}):
+        response = client.get(url, params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_room_spans_clips_to_window():
+    start = datetime.date(2018, 2, 1)
+    stays = [
+        (1, datetime.date(2018, 1, 1), datetime.date(2018, 1, 31)),
+        (2, datetime.date(2018, 1, 30), datetime.date(2018, 2, 1)),
+        (3, datetime.date(2018, 2, 3), datetime.date(2018, 3, 3)),
+    ]
+    assert room_spans(stays, start, 5) == [[1, 2], [1, None], [3, 3]]
+    assert room_spans([], start, 5) == [[5, None]]
+
+
+@pytest.mark.django_db
+def test_calendar_from_lagging_replica_is_not_cached(client, superuser, customer, destination, lagging_replica):
+    client.force_authenticate(user=superuser)
+    lagging_replica()
+    room = destination.rooms.order_by('number').first()
+    reservation = Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01',
+                                             end_date='2018-02-01')
+
+    # Read from the replica, which hasn't seen the reservation yet
+    assert get_calendar(client, destination, '2018-02-01', '2018-02-01')['rooms'][0]['spans'] == [[1, None]]
+
+    pin_to_primary(client)
+    calendar = get_calendar(client, destination, '2018-02-01', '2018-02-01')
+    assert calendar['rooms'][0]['spans'] == [[1, reservation.id]]
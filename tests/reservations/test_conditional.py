@@ -0,0 +1,127 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from core.middleware import ReplicaMiddleware
+from reservations.models import Customer, Reservation
+from tests.helpers import pin_to_primary
+
+
+@pytest.fixture
+def reservation(customer, room):
+    return Reservation.objects.create(
+        customer=customer,
+        room=room,
+        start_date='2018-02-01',
+        end_date='2018-02-03',
+    )
+
+
+@pytest.mark.parametrize('url_name', ['reservation-list', 'room-list', 'customer-list', 'destination-list'])
+@pytest.mark.django_db
+def test_list_not_modified(client, superuser, reservation, url_name):
+    client.force_authenticate(user=superuser)
+    url = reverse(url_name)
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    etag = response['ETag']
+
+    # No queries for the resource itself (only savepoints), and nothing serialized
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response['ETag'] == etag
+    assert not response.content
+    assert not [q for q in queries if 'reservations_' in q['sql']]
+
+    # Different query parameters get different validators
+    response = client.get(url, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_detail_not_modified(client, superuser, reservation):
+    client.force_authenticate(user=superuser)
+    url = reverse('reservation-detail', args=[reservation.pk])
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_modified_after_change(client, superuser, reservation, customer):
+    client.force_authenticate(user=superuser)
+    list_url = reverse('reservation-list')
+    detail_url = reverse('reservation-detail', args=[reservation.pk])
+
+    list_etag = client.get(list_url)['ETag']
+    detail_etag = client.get(detail_url)['ETag']
+
+    response = client.patch(detail_url, {'end_date': '2018-02-04'})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['end_date'] == '2018-02-04'
+
+    # Changes to related tables count too, since they can be expanded
+    detail_etag = response['ETag']
+    customer.delete()
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_room_not_affected_by_reservations(client, superuser, room, customer):
+    client.force_authenticate(user=superuser)
+    url = reverse('room-list')
+
+    etag = client.get(url)['ETag']
+    Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-03')
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_bulk_create_changes_version(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+    url = reverse('reservation-list')
+
+    etag = client.get(url)['ETag']
+    data = [{'customer': customer.id, 'room': room.id, 'start_date': '2018-02-01', 'end_date': '2018-02-02'}]
+    client.post(reverse('reservation-bulk'), data, format='json')
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_no_validators_from_lagging_replica(client, superuser, customer, lagging_replica):
+    client.force_authenticate(user=superuser)
+    url = reverse('customer-list')
+    lagging_replica()
+    new = Customer.objects.create(first_name='Ann', last_name='Lee', phone='555-555-0000', email='ann@example.com')
+
+    # The replica hasn't seen the new customer, so its response can't be
+    # labelled with the new version
+    response = client.get(url)
+    assert [item['id'] for item in response.data['results']] == [customer.id]
+    assert 'ETag' not in response and 'Last-Modified' not in response
+
+    pin_to_primary(client)
+    response = client.get(url)
+    assert [item['id'] for item in response.data['results']] == [customer.id, new.id]
+    etag = response['ETag']
+
+    # Validators from the primary are still checked when reading from the replica
+    del client.cookies[ReplicaMiddleware.cookie_name]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,77 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.models import Customer, CustomerQuerySet
+
+
+def search_ids(client, **params):
+    response = client.get(reverse('customer-list'), params)
+    assert response.status_code == status.HTTP_200_OK
+    return [customer['id'] for customer in response.data['results']]
+
+
+@pytest.mark.parametrize('query', [
+    'mitch',  # Last name
+    'JUL',  # First name, any case
+    'juliemitchell@',  # Email
+    '555-555-12',  # Phone
+    'julie mitchell',  # Every word has to match
+])
+@pytest.mark.django_db
+def test_search(client, superuser, customer, other_customer, query):
+    client.force_authenticate(user=superuser)
+
+    assert search_ids(client, q=query) == [customer.id]
+
+
+@pytest.mark.django_db
+def test_search_prefix_only(client, superuser, customer, other_customer):
+    client.force_authenticate(user=superuser)
+
+    assert search_ids(client, q='itchell') == []
+    assert search_ids(client, q='julie chapman') == []
+    assert search_ids(client, q='555') == [customer.id, other_customer.id]
+
+
+@pytest.mark.django_db
+def test_email_lookup(client, superuser, customer, other_customer):
+    client.force_authenticate(user=superuser)
+
+    assert search_ids(client, email='DonaldChapman@example.com') == [other_customer.id]
+    assert search_ids(client, email='donaldchapman@example') == []
+
+
+@pytest.mark.django_db
+def test_search_prefix_boundaries(customer):
+    def matches(name, prefix):
+        customer.first_name = name
+        customer.save()
+        return Customer.objects.filter(first_name__istartswith=prefix).exists()
+
+    # The character after `@` is `A`, which sorts as `a`
+    assert matches('john@example.com', 'John@')
+    assert not matches('john_smith', 'john@')
+    assert not matches('john^x', 'john@')
+    # No character comes after the last one
+    assert matches('john\U0010ffff', 'JOHN\U0010ffff')
+    assert not matches('john', 'john\U0010ffff')
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Checks the SQLite query plan')
+@pytest.mark.django_db
+def test_search_uses_indexes():
+    def query_plan(queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    plan = query_plan(Customer.objects.search('mitch'))
+    assert 'SCAN' not in plan
+    for field in CustomerQuerySet.SEARCH_FIELDS:
+        assert 'customer_{}_search_idx'.format(field) in plan
+
+    plan = query_plan(Customer.objects.filter(email__iexact='JulieMitchell@example.com'))
+    assert 'SEARCH reservations_customer USING INDEX customer_email_search_idx' in plan
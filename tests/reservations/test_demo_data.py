@@ -0,0 +1,47 @@
+import pytest
+from django.core.management import call_command, CommandError
+
+from reservations.models import Customer, Destination, Reservation
+
+
+def reservation_rows():
+    return list(Reservation.objects.order_by('room_id', 'start_date').values_list(
+        'room_id', 'start_date', 'end_date', 'customer_id'
+    ))
+
+
+@pytest.mark.django_db
+def test_load_demo_data():
+    call_command('load_demo_data', destinations=3, customers=50, reservations=2000, batch_size=300)
+
+    assert Destination.objects.count() == 3
+    assert Customer.objects.count() == 50
+    assert Reservation.objects.count() == 2000
+
+    # Reservations for the same room never overlap
+    rows = reservation_rows()
+    for previous, current in zip(rows, rows[1:]):
+        assert previous[2] >= previous[1]
+        if previous[0] == current[0]:
+            assert current[1] > previous[2]
+
+
+@pytest.mark.django_db
+def test_load_demo_data_seed():
+    def load():
+        call_command('load_demo_data', destinations=1, customers=5, reservations=100, seed=42)
+        data = (
+            list(Customer.objects.order_by('id').values_list('email', flat=True)),
+            list(Reservation.objects.order_by('id').values_list('room__number', 'start_date', 'end_date')),
+        )
+        for model in (Reservation, Customer, Destination):
+            model.objects.all().delete()
+        return data
+
+    assert load() == load()
+
+
+@pytest.mark.django_db
+def test_load_demo_data_reservations_need_customers():
+    with pytest.raises(CommandError):
+        call_command('load_demo_data', destinations=1, customers=0, reservations=10)
@@ -0,0 +1,83 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.models import Reservation
+
+
+@pytest.fixture
+def reservation(customer, room):
+    return Reservation.objects.create(
+        customer=customer,
+        room=room,
+        start_date='2018-02-01',
+        end_date='2018-02-03',
+    )
+
+
+@pytest.mark.django_db
+def test_no_expand(client, superuser, reservation):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('reservation-detail', args=[reservation.pk]))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['customer'] == reservation.customer_id
+    assert response.data['room'] == reservation.room_id
+
+
+@pytest.mark.django_db
+def test_expand_reservation(client, superuser, reservation, customer, room, destination):
+    client.force_authenticate(user=superuser)
+
+    url = reverse('reservation-detail', args=[reservation.pk])
+    response = client.get(url, {'expand': 'customer,room'})
+    assert response.status_code == status.HTTP_200_OK
+
+    assert list(response.data) == ['id', 'customer', 'room', 'start_date', 'end_date', 'status']
+    assert response.data['customer']['email'] == customer.email
+    assert response.data['room'] == {'id': room.id, 'number': room.number, 'destination': destination.id}
+
+    # Nested expansion
+    response = client.get(url, {'expand': 'room.destination'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['customer'] == customer.id
+    assert response.data['room']['destination']['name'] == destination.name
+
+
+@pytest.mark.django_db
+def test_expand_room(client, superuser, room, destination):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('room-detail', args=[room.pk]), {'expand': 'destination'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['destination']['id'] == destination.id
+
+
+@pytest.mark.django_db
+def test_expand_query_count(client, superuser, customer, destination):
+    client.force_authenticate(user=superuser)
+
+    def count_queries():
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('reservation-list'), {'expand': 'customer,room,room.destination'})
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries)
+
+    rooms = list(destination.rooms.all()[:20])
+    Reservation.objects.create(customer=customer, room=rooms[0], start_date='2018-02-01', end_date='2018-02-03')
+    single = count_queries()
+
+    for room in rooms[1:]:
+        Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-03')
+    assert count_queries() == single
+
+
+@pytest.mark.parametrize('expand', ['destination', 'customer,room.customer', 'room.destination.rooms'])
+@pytest.mark.django_db
+def test_expand_invalid(client, superuser, reservation, expand):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('reservation-list'), {'expand': expand})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
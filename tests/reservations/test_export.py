@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.models import Destination, Reservation, Room
+
+
+@pytest.fixture
+def reservations(customer, room, other_room):
+    return [
+        Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-03'),
+        Reservation.objects.create(customer=customer, room=room, start_date='2018-03-01', end_date='2018-03-03'),
+        Reservation.objects.create(customer=customer, room=other_room, start_date='2018-02-10', end_date='2018-02-12'),
+    ]
+
+
+def export(client, **params):
+    response = client.get(reverse('reservation-export'), params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+def export_ids(client, **params):
+    return [json.loads(line)['id'] for line in export(client, **params).splitlines()]
+
+
+@pytest.mark.django_db
+def test_export_ndjson(client, superuser, reservations):
+    client.force_authenticate(user=superuser)
+
+    lines = [json.loads(line) for line in export(client).splitlines()]
+
+    assert lines[0] == {
+        'id': reservations[0].id,
+        'customer': reservations[0].customer_id,
+        'room': reservations[0].room_id,
+        'start_date': '2018-02-01',
+        'end_date': '2018-02-03',
+        'status': 'checked_out',
+    }
+    assert [line['id'] for line in lines] == [reservation.id for reservation in reservations]
+
+
+@pytest.mark.django_db
+def test_export_csv(client, superuser, reservations):
+    client.force_authenticate(user=superuser)
+
+    rows = list(csv.DictReader(io.StringIO(export(client, output='csv'))))
+
+    assert len(rows) == 3
+    assert rows[2] == {
+        'id': str(reservations[2].id),
+        'customer': str(reservations[2].customer_id),
+        'room': str(reservations[2].room_id),
+        'start_date': '2018-02-10',
+        'end_date': '2018-02-12',
+        'status': 'checked_out',
+    }
+
+
+@pytest.mark.django_db
+def test_export_filters(client, superuser, customer, reservations):
+    client.force_authenticate(user=superuser)
+
+    assert export_ids(client, start='2018-02-03', end='2018-02-10') == [reservations[0].id, reservations[2].id]
+    assert export_ids(client, start='2018-02-11') == [reservations[1].id, reservations[2].id]
+    assert export_ids(client, end='2018-02-01') == [reservations[0].id]
+
+    other_destination = Destination.objects.create(
+        name='Other Hotel',
+        address_1='456 Fake St',
+        city='Los Angeles',
+        state='CA',
+        zip='90210'
+    )
+    other_reservation = Reservation.objects.create(
+        customer=customer,
+        room=Room.objects.create(number=101, destination=other_destination),
+        start_date='2018-02-01',
+        end_date='2018-02-03'
+    )
+    assert export_ids(client, destination=other_destination.id) == [other_reservation.id]
+
+
+@pytest.mark.parametrize('params', [
+    {'output': 'xml'},
+    {'start': '2018-02-05', 'end': '2018-02-01'},
+    {'destination': 'abc'},
+])
+@pytest.mark.django_db
+def test_export_invalid_params(client, superuser, params):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('reservation-export'), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,66 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from reservations.fastpath import ValuesSerializer
+from reservations.models import Reservation
+from reservations.serializers import ReservationSerializer
+
+
+@pytest.fixture
+def reservations(customer, other_customer, destination):
+    today = timezone.now().date()
+    rooms = destination.rooms.all()[:3]
+    return [
+        Reservation.objects.create(customer=customer, room=rooms[0], start_date='2018-02-01', end_date='2018-02-03'),
+        Reservation.objects.create(customer=other_customer, room=rooms[1], start_date=today, end_date=today),
+        Reservation.objects.create(customer=customer, room=rooms[2], start_date='2999-01-01', end_date='2999-01-02'),
+    ]
+
+
+def get_content(client, url, params):
+    response = client.get(url, params)
+    assert response.status_code == status.HTTP_200_OK
+    return response.content
+
+
+@pytest.mark.parametrize('url_name,params', [
+    ('customer-list', {}),
+    ('destination-list', {}),
+    ('room-list', {'page_size': 7}),
+    ('reservation-list', {}),
+    ('reservation-list', {'ordering': 'status'}),
+    ('reservation-list', {'status': 'in_house'}),
+])
+@pytest.mark.django_db
+def test_fast_list_matches_serializer(client, superuser, reservations, monkeypatch, url_name, params):
+    client.force_authenticate(user=superuser)
+    url = reverse(url_name)
+
+    fast = get_content(client, url, params)
+
+    monkeypatch.setattr(ValuesSerializer, 'for_serializer', classmethod(lambda cls, serializer_class: None))
+    regular = get_content(client, url, params)
+
+    assert fast == regular
+
+
+@pytest.mark.django_db
+def test_fast_list_used(client, superuser, reservations, monkeypatch):
+    client.force_authenticate(user=superuser)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Regular serializer used')
+
+    monkeypatch.setattr(ReservationSerializer, 'to_representation', fail)
+    assert len(client.get(reverse('reservation-list')).data['results']) == 3
+
+
+def test_unsupported_serializer():
+    assert ValuesSerializer.for_serializer(ReservationSerializer) is not None
+
+    class NestedSerializer(ReservationSerializer):
+        room = ReservationSerializer.expandable_fields['room']()
+
+    assert ValuesSerializer.for_serializer(NestedSerializer) is None
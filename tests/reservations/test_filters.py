@@ -0,0 +1,111 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.six import StringIO
+from rest_framework import status
+
+from reservations.filters import filter_reservations
+from reservations.models import Reservation, Room
+
+
+@pytest.fixture
+def reservations(customer, other_customer, room, other_room):
+    return [
+        Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-03'),
+        Reservation.objects.create(customer=other_customer, room=room, start_date='2018-02-05',
+                                   end_date='2018-02-10'),
+        Reservation.objects.create(customer=customer, room=other_room, start_date='2018-02-03',
+                                   end_date='2018-02-05'),
+    ]
+
+
+def filtered_ids(client, **params):
+    response = client.get(reverse('reservation-list'), params)
+    assert response.status_code == status.HTTP_200_OK
+    return [reservation['id'] for reservation in response.data['results']]
+
+
+@pytest.mark.parametrize('params,expected', [
+    ({'start': '2018-02-04', 'end': '2018-02-05'}, [1, 2]),
+    ({'start': '2018-02-06'}, [1]),
+    ({'end': '2018-02-01'}, [0]),
+    ({'arrival': '2018-02-03'}, [2]),
+    ({'departure': '2018-02-03'}, [0]),
+    ({'start': '2018-02-03', 'end': '2018-02-03', 'room': 'room'}, [0]),
+    ({'customer': 'customer'}, [0, 2]),
+    ({'customer': 'customer', 'start': '2018-02-04'}, [2]),
+])
+@pytest.mark.django_db
+def test_filters(client, superuser, reservations, customer, room, params, expected):
+    client.force_authenticate(user=superuser)
+    ids = {'room': room.id, 'customer': customer.id}
+    params = {name: ids.get(value, value) for name, value in params.items()}
+
+    assert filtered_ids(client, **params) == [reservations[index].id for index in expected]
+
+
+@pytest.mark.django_db
+def test_destination_filter(client, superuser, reservations, customer, destination):
+    client.force_authenticate(user=superuser)
+
+    assert filtered_ids(client, destination=destination.id) == [reservation.id for reservation in reservations]
+    assert filtered_ids(client, destination=destination.id + 1) == []
+
+
+@pytest.mark.parametrize('params', [
+    {'start': '2018-02-05', 'end': '2018-02-01'},
+    {'arrival': 'tomorrow'},
+    {'room': 'abc'},
+])
+@pytest.mark.django_db
+def test_invalid_filters(client, superuser, reservations, params):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('reservation-list'), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return ' | '.join(row[-1] for row in cursor.fetchall())
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Checks the SQLite query plan')
+@pytest.mark.django_db
+def test_filters_use_indexes():
+    call_command('load_demo_data', destinations=4, customers=200, reservations=5000, seed=1, stdout=StringIO())
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    today = timezone.now().date()
+    room = Room.objects.first()
+    customer_id = Reservation.objects.values_list('customer_id', flat=True).first()
+    month = {'start': today, 'end': today + datetime.timedelta(days=30)}
+
+    # Only index names are checked, the rest of the plan's wording varies
+    # between SQLite versions
+    cases = [
+        ({'room': room.id}, 'reservations_reservation_room_id'),
+        ({'customer': customer_id}, 'reservation_customer_dates_idx'),
+        ({'customer': customer_id, 'start': today}, 'reservation_customer_dates_idx'),
+        ({'destination': room.destination_id}, 'reservations_room_destination_id'),
+        (dict(month, destination=room.destination_id), 'reservation_room_end_idx'),
+        ({'arrival': today}, 'reservation_start_idx'),
+        ({'departure': today}, 'reservation_end_start_idx'),
+        ({'departure': today, 'destination': room.destination_id}, 'reservation_end_start_idx'),
+    ]
+    for filters, expected in cases:
+        # As run for a page of the reservation list
+        queryset = filter_reservations(Reservation.objects.with_status(today), filters).order_by('id')[:101]
+        assert expected in query_plan(queryset), filters
+
+    # A date range alone is answered from an index (when paginating by id,
+    # SQLite can prefer walking the primary key, stopping after a page)
+    plan = query_plan(filter_reservations(Reservation.objects.all(), month))
+    assert any(index in plan for index in ('reservation_start_idx', 'reservation_end_start_idx'))
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.idempotency import (
+    get_cache, get_response_key, IdempotentRequest
+)
+from reservations.models import Reservation
+
+
+def reservation_data(customer, room, start, end):
+    return {
+        'customer': customer.id,
+        'room': room.id,
+        'start_date': start,
+        'end_date': end,
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_repeated_create_is_replayed(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+    data = reservation_data(customer, room, '2018-02-01', '2018-02-03')
+
+    first = client.post(reverse('reservation-list'), data, HTTP_IDEMPOTENCY_KEY='abc')
+    assert first.status_code == status.HTTP_201_CREATED
+    assert not first.has_header('Idempotent-Replayed')
+
+    # The retry isn't rejected as a conflict with the first request
+    second = client.post(reverse('reservation-list'), data, HTTP_IDEMPOTENCY_KEY='abc')
+    assert second.status_code == status.HTTP_201_CREATED
+    assert second['Idempotent-Replayed'] == 'true'
+    assert second.data == first.data
+    assert Reservation.objects.count() == 1
+
+    # Without a key the request is processed again
+    third = client.post(reverse('reservation-list'), data)
+    assert third.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+def test_repeated_update_is_replayed(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+    reservation = Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01',
+                                             end_date='2018-02-03')
+    url = reverse('reservation-detail', args=[reservation.id])
+
+    first = client.patch(url, {'end_date': '2018-02-04'}, HTTP_IDEMPOTENCY_KEY='abc')
+    assert first.status_code == status.HTTP_200_OK
+
+    Reservation.objects.filter(id=reservation.id).update(end_date='2018-02-10')
+    second = client.patch(url, {'end_date': '2018-02-04'}, HTTP_IDEMPOTENCY_KEY='abc')
+    assert second.data == first.data
+    assert Reservation.objects.get(id=reservation.id).end_date.isoformat() == '2018-02-10'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_key_reused_for_different_request(client, superuser, user, customer, room):
+    client.force_authenticate(user=superuser)
+    client.post(reverse('reservation-list'), reservation_data(customer, room, '2018-02-01', '2018-02-03'),
+                HTTP_IDEMPOTENCY_KEY='abc')
+
+    response = client.post(reverse('reservation-list'), reservation_data(customer, room, '2018-03-01', '2018-03-03'),
+                           HTTP_IDEMPOTENCY_KEY='abc')
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    # Keys are per user
+    client.force_authenticate(user=user)
+    response = client.post(reverse('reservation-list'), reservation_data(customer, room, '2018-03-01', '2018-03-03'),
+                           HTTP_IDEMPOTENCY_KEY='abc')
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_errors_are_not_stored(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+    existing = Reservation.objects.create(customer=customer, room=room, start_date='2018-02-02',
+                                          end_date='2018-02-05')
+    data = reservation_data(customer, room, '2018-02-01', '2018-02-03')
+
+    response = client.post(reverse('reservation-list'), data, HTTP_IDEMPOTENCY_KEY='abc')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    existing.delete()
+    response = client.post(reverse('reservation-list'), data, HTTP_IDEMPOTENCY_KEY='abc')
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_waits_for_request_in_progress(client, superuser, customer, room, settings):
+    client.force_authenticate(user=superuser)
+    data = reservation_data(customer, room, '2018-02-01', '2018-02-03')
+    url = reverse('reservation-list')
+    cache = get_cache()
+    response_key = get_response_key(superuser, 'abc')
+
+    # Make it look like the first request is still being processed
+    first = client.post(url, data, HTTP_IDEMPOTENCY_KEY='abc')
+    stored = cache.get(response_key)
+    cache.delete(response_key)
+    cache.add(response_key + '_lock', 'first', 60)
+
+    # Gives up if the first request doesn't finish in time
+    settings.IDEMPOTENCY_WAIT_SECONDS = 0.2
+    response = client.post(url, data, HTTP_IDEMPOTENCY_KEY='abc')
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    def finish():
+        time.sleep(0.2)
+        cache.set(response_key, stored)
+        cache.delete(response_key + '_lock')
+
+    # Otherwise gets its response once it's stored
+    settings.IDEMPOTENCY_WAIT_SECONDS = 5
+    thread = threading.Thread(target=finish)
+    thread.start()
+    response = client.post(url, data, HTTP_IDEMPOTENCY_KEY='abc')
+    thread.join()
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data == first.data
+    assert Reservation.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_retried_update_is_not_throttled(client, user, customer, room):
+    client.force_authenticate(user=user)
+    reservation = Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01',
+                                             end_date='2018-02-03')
+    url = reverse('reservation-detail', args=[reservation.id])
+
+    first = client.patch(url, {'end_date': '2018-02-04'}, HTTP_IDEMPOTENCY_KEY='abc')
+    assert first.status_code == status.HTTP_200_OK
+
+    # Only one update per reservation and minute, but retries get the stored response
+    second = client.patch(url, {'end_date': '2018-02-04'}, HTTP_IDEMPOTENCY_KEY='abc')
+    assert second.status_code == status.HTTP_200_OK
+    assert second['Idempotent-Replayed'] == 'true'
+
+    response = client.patch(url, {'end_date': '2018-02-05'}, HTTP_IDEMPOTENCY_KEY='def')
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def test_expired_lock_is_not_released(rf, anonymous_user, settings):
+    settings.IDEMPOTENCY_LOCK_SECONDS = 0.5
+    request = rf.post('/')
+    request.user = anonymous_user
+    request.data = {}
+    first = IdempotentRequest(request, 'abc')
+    assert first.acquire() is None
+
+    # Too close to expiring: the lock may already belong to another request
+    first.release()
+    assert get_cache().get(first.lock_key) == first.lock
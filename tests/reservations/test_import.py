@@ -0,0 +1,101 @@
+import csv
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.six import StringIO
+
+from reservations.models import Reservation
+
+
+def write_csv(path, fieldnames, rows):
+    with open(str(path), 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def read_report(path):
+    with open(path, newline='') as report:
+        return {int(row['row']): json.loads(row['errors']) for row in csv.DictReader(report)}
+
+
+@pytest.mark.django_db
+def test_import(tmpdir, customer, other_customer, room, other_room):
+    Reservation.objects.create(customer=customer, room=room, start_date='2018-03-01', end_date='2018-03-05')
+    path = write_csv(tmpdir.join('reservations.csv'), ['customer', 'room', 'start_date', 'end_date'], [
+        {'customer': customer.id, 'room': room.id, 'start_date': '2018-02-01', 'end_date': '2018-02-03'},
+        # Overlaps the first row
+        {'customer': other_customer.id, 'room': room.id, 'start_date': '2018-02-03', 'end_date': '2018-02-04'},
+        # Overlaps an existing reservation
+        {'customer': customer.id, 'room': room.id, 'start_date': '2018-02-27', 'end_date': '2018-03-01'},
+        {'customer': other_customer.id, 'room': other_room.id, 'start_date': '2018-02-01', 'end_date': '2018-02-10'},
+        # Overlaps the previous row, in another chunk
+        {'customer': customer.id, 'room': other_room.id, 'start_date': '2018-02-10', 'end_date': '2018-02-12'},
+        {'customer': 0, 'room': room.id, 'start_date': '2018-02-05', 'end_date': 'soon'},
+        {'customer': customer.id, 'room': '', 'start_date': '2018-02-05', 'end_date': '2018-02-01'},
+    ])
+
+    out = StringIO()
+    call_command('import_reservations', path, chunk_size=4, stdout=out)
+    assert 'Imported 2 reservations and rejected 5 rows' in out.getvalue()
+    assert 'rows/sec' in out.getvalue()
+
+    created = Reservation.objects.exclude(start_date='2018-03-01').order_by('start_date', 'room_id')
+    assert [(reservation.room_id, reservation.start_date.isoformat()) for reservation in created] == [
+        (room.id, '2018-02-01'), (other_room.id, '2018-02-01'),
+    ]
+
+    conflict = {'non_field_errors': ['Conflicting reservation exists for this room and date range.']}
+    assert read_report(path + '.rejected.csv') == {
+        2: conflict,
+        3: conflict,
+        5: conflict,
+        6: {'customer': ['No match found.'],
+            'end_date': ['Date has wrong format. Use one of these formats instead: YYYY-MM-DD.']},
+        7: {'room': ['This field is required.']},
+    }
+
+
+@pytest.mark.django_db
+def test_import_lookups(tmpdir, customer, other_customer, room, destination):
+    report = str(tmpdir.join('report.csv'))
+    path = write_csv(tmpdir.join('reservations.csv'), ['customer_email', 'destination', 'room_number', 'start_date',
+                                                       'end_date'], [
+        {'customer_email': customer.email.upper(), 'destination': destination.id, 'room_number': room.number,
+         'start_date': '2018-02-01', 'end_date': '2018-02-03'},
+        {'customer_email': 'nobody@example.com', 'destination': destination.id, 'room_number': room.number,
+         'start_date': '2018-02-05', 'end_date': '2018-02-06'},
+        {'customer_email': customer.email, 'destination': destination.id, 'room_number': 999,
+         'start_date': '2018-02-05', 'end_date': '2018-02-06'},
+    ])
+
+    call_command('import_reservations', path, report=report, stdout=StringIO())
+
+    reservation = Reservation.objects.get()
+    assert (reservation.customer_id, reservation.room_id) == (customer.id, room.id)
+    assert read_report(report) == {
+        2: {'customer': ['No match found.']},
+        3: {'room': ['No match found.']},
+    }
+
+
+@pytest.mark.django_db
+def test_import_export_round_trip(tmpdir, client, superuser, customer, room):
+    Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-03')
+    client.force_authenticate(user=superuser)
+    response = client.get('/api/reservations/export/', {'output': 'csv'})
+    path = str(tmpdir.join('export.csv'))
+    with open(path, 'wb') as export:
+        export.write(b''.join(response.streaming_content))
+
+    Reservation.objects.all().delete()
+    call_command('import_reservations', path, stdout=StringIO())
+    assert Reservation.objects.get().start_date.isoformat() == '2018-02-01'
+
+
+def test_import_invalid_chunk_size(tmpdir):
+    with pytest.raises(CommandError):
+        call_command('import_reservations', str(tmpdir.join('missing.csv')), chunk_size=0)
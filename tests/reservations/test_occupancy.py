@@ -0,0 +1,142 @@
+import datetime
+import random
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from reservations import occupancy
+from reservations.models import Reservation, Room
+
+
+@pytest.fixture
+def index_enabled(settings):
+    settings.OCCUPANCY_INDEX = True
+    settings.OCCUPANCY_INDEX_DAYS = 200
+    occupancy._index = None
+    yield
+    occupancy._index = None
+
+
+def days_from_today(days):
+    return timezone.now().date() + datetime.timedelta(days=days)
+
+
+@pytest.fixture
+def random_reservations(customer, destination):
+    '''
+    Non-overlapping reservations of random length in every room
+    '''
+    random.seed(1)
+    reservations = []
+    for room in destination.rooms.all():
+        day = random.randrange(-5, 5)
+        while day < 210:
+            end = day + random.randrange(7)
+            reservations.append(Reservation(
+                customer=customer, room=room, start_date=days_from_today(day), end_date=days_from_today(end)
+            ))
+            day = end + random.randrange(1, 20)
+    Reservation.objects.bulk_create(reservations)
+
+
+@pytest.mark.django_db
+def test_free_rooms_match_sql(index_enabled, destination, random_reservations):
+    index = occupancy.get_index()
+
+    for start, length in [(0, 0), (3, 5), (60, 1), (63, 2), (120, 30), (190, 9)]:
+        start, end = days_from_today(start), days_from_today(start + length)
+        expected = set(destination.rooms.available(start, end).values_list('id', flat=True))
+        assert set(index.free_rooms(destination.id, start, end)) == expected
+
+    assert index.check() == {'mismatched_rooms': [], 'double_booked_rooms': []}
+
+
+@pytest.mark.django_db
+def test_outside_index(index_enabled, destination):
+    assert occupancy.free_rooms(destination.id, days_from_today(-1), days_from_today(3)) is None
+    assert occupancy.free_rooms(destination.id, days_from_today(190), days_from_today(200)) is None
+    assert len(occupancy.free_rooms(destination.id, days_from_today(0), days_from_today(199))) == 240
+
+
+@pytest.mark.django_db(transaction=True)
+def test_incremental_updates(index_enabled, customer, destination, room, other_room):
+    index = occupancy.get_index()
+
+    reservation = Reservation.objects.create(
+        customer=customer, room=room, start_date=days_from_today(60), end_date=days_from_today(70)
+    )
+    assert room.id not in occupancy.free_rooms(destination.id, days_from_today(70), days_from_today(75))
+
+    reservation.room = other_room
+    reservation.start_date = days_from_today(65)
+    reservation.save()
+    free = occupancy.free_rooms(destination.id, days_from_today(60), days_from_today(64))
+    assert room.id in free and other_room.id in free
+    assert other_room.id not in occupancy.free_rooms(destination.id, days_from_today(65), days_from_today(65))
+
+    reservation.delete()
+    assert other_room.id in occupancy.free_rooms(destination.id, days_from_today(65), days_from_today(65))
+
+    # Updated in place, without rebuilding
+    assert occupancy.get_index() is index
+    assert index.check() == {'mismatched_rooms': [], 'double_booked_rooms': []}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replay_changes_from_other_processes(index_enabled, customer, destination, room, other_room):
+    index = occupancy.get_index()
+
+    # Changes made in another process, which has no index yet
+    occupancy._index = None
+    reservation = Reservation.objects.create(
+        customer=customer, room=room, start_date=days_from_today(60), end_date=days_from_today(70)
+    )
+    reservation.room = other_room
+    reservation.save()
+    occupancy._index = index
+
+    # Replayed from the shared log, without rebuilding
+    assert occupancy.get_index() is index
+    free = occupancy.free_rooms(destination.id, days_from_today(60), days_from_today(60))
+    assert room.id in free and other_room.id not in free
+    assert index.check() == {'mismatched_rooms': [], 'double_booked_rooms': []}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_after_missed_change(index_enabled, destination):
+    index = occupancy.get_index()
+
+    # A change that isn't in the log, e.g. because it expired
+    occupancy.change_count(increment=True)
+    assert occupancy.get_index() is not index
+
+    # Bulk inserts and room changes make every process rebuild
+    index = occupancy.get_index()
+    Room.objects.create(number=999, destination=destination)
+    assert occupancy.get_index() is not index
+
+
+@pytest.mark.django_db
+def test_availability_uses_index(client, superuser, index_enabled, destination, random_reservations):
+    client.force_authenticate(user=superuser)
+    start, end = days_from_today(10), days_from_today(20)
+
+    response = client.get(reverse('destination-availability', args=[destination.pk]), {'start': start, 'end': end})
+    assert response.status_code == status.HTTP_200_OK
+
+    assert occupancy._index is not None
+    assert [room['id'] for room in response.data] == list(
+        destination.rooms.available(start, end).order_by('number').values_list('id', flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_occupancy_index_command(destination, random_reservations, capsys):
+    call_command('occupancy_index', samples=20)
+    out, _ = capsys.readouterr()
+    assert 'Index matches the database.' in out
+
+    call_command('occupancy_index', rebuild=True)
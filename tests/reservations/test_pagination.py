@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from reservations.models import Customer, Reservation
+
+
+@pytest.fixture
+def customers():
+    return [
+        Customer.objects.create(
+            first_name='Customer',
+            last_name=str(num),
+            phone='555-555-{:04}'.format(num),
+            email='customer{}@example.com'.format(num)
+        )
+        for num in range(7)
+    ]
+
+
+@pytest.mark.django_db
+def test_cursor_pagination(client, superuser, customers):
+    client.force_authenticate(user=superuser)
+
+    # Follow `next` links until the last page
+    seen = []
+    url = reverse('customer-list')
+    params = {'page_size': 3}
+    while url:
+        response = client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) <= 3
+
+        seen.extend(customer['id'] for customer in response.data['results'])
+        url = response.data['next']
+        params = None
+
+    assert seen == [customer.id for customer in customers]
+
+
+@pytest.mark.django_db
+def test_max_page_size(client, superuser, customers, settings):
+    client.force_authenticate(user=superuser)
+    settings.MAX_PAGE_SIZE = 5
+
+    response = client.get(reverse('customer-list'), {'page_size': 100})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['results']) == 5
+    assert response.data['next'] is not None
+
+
+@pytest.mark.django_db
+def test_pagination_skips_count_and_offset(client, superuser, customers):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('customer-list'), {'page_size': 3})
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(response.data['next'])
+    assert response.status_code == status.HTTP_200_OK
+
+    customer_queries = [q['sql'] for q in queries if 'reservations_customer' in q['sql']]
+    assert len(customer_queries) == 1
+    assert 'COUNT(' not in customer_queries[0]
+    assert 'OFFSET' not in customer_queries[0]
+
+
+def follow(client, url, params, link):
+    '''
+    Ids from every page, following `link` ("next" or "previous") links
+    '''
+    pages = []
+    while url:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        assert not [q['sql'] for q in queries if 'OFFSET' in q['sql']]
+
+        pages.append([reservation['id'] for reservation in response.data['results']])
+        url = response.data[link]
+        params = None
+    return pages
+
+
+@pytest.mark.parametrize('ordering', ['start_date', '-status', 'end_date,-id'])
+@pytest.mark.django_db
+def test_cursor_pagination_ordering(client, superuser, customer, destination, ordering):
+    client.force_authenticate(user=superuser)
+    rooms = list(destination.rooms.all()[:4])
+    for day in range(1, 4):
+        for room in rooms:
+            Reservation.objects.create(customer=customer, room=room, start_date='2018-02-0{}'.format(day),
+                                       end_date='2018-02-0{}'.format(day))
+
+    expected = [
+        reservation['id']
+        for reservation in client.get(reverse('reservation-list'), {'ordering': ordering}).data['results']
+    ]
+    assert len(expected) == 12
+
+    # Pages split rows with the same start date, status or end date
+    pages = follow(client, reverse('reservation-list'), {'ordering': ordering, 'page_size': 5}, 'next')
+    assert [len(page) for page in pages] == [5, 5, 2]
+    assert sum(pages, []) == expected
+
+    # And back again from the last page
+    last = client.get(reverse('reservation-list'), {'ordering': ordering, 'page_size': 5})
+    last = client.get(client.get(last.data['next']).data['next'])
+    pages = follow(client, last.data['previous'], None, 'previous')
+    assert sum(reversed(pages), []) + [row['id'] for row in last.data['results']] == expected
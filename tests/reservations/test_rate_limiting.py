@@ -1,11 +1,16 @@
 import time
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.dateparse import parse_date
 from rest_framework import status
 
+from core.cache import FileBasedCache
 from reservations.models import Reservation
+from reservations.throttling import PerReservationRateThrottle
+from reservations.views import ReservationViewSet
 
 
 @pytest.fixture
@@ -73,3 +78,66 @@ def test_rate_limit_wait(client, user, reservation):
     # Date should now be updated to second update
     reservation.refresh_from_db()
     assert reservation.end_date == parse_date(second_date)
+
+
+@pytest.mark.django_db
+def test_rate_limit_headers(client, user, reservation):
+    client.force_authenticate(user=user)
+
+    # Regular requests report the user rate limit
+    response = client.get(reverse('reservation-list'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['X-RateLimit-Limit'] == '1000'
+    assert response['X-RateLimit-Remaining'] == '999'
+    assert 0 < int(response['X-RateLimit-Reset']) <= 66
+
+    # Updates report the (more restrictive) per-reservation limit
+    url = reverse('reservation-detail', args=[reservation.pk])
+    response = client.patch(url, {'end_date': '2018-2-20'})
+    assert response['X-RateLimit-Limit'] == '1'
+    assert response['X-RateLimit-Remaining'] == '0'
+
+    response = client.patch(url, {'end_date': '2018-2-21'})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response['X-RateLimit-Remaining'] == '0'
+    assert 'Retry-After' in response
+
+
+def make_throttle(cache, now):
+    throttle = PerReservationRateThrottle()
+    throttle.cache = cache
+    throttle.timer = lambda: now
+    return throttle
+
+
+def test_rate_limit_sliding_window(rf, tmpdir):
+    '''
+    Throttle state is shared through the cache, e.g. between worker processes
+    '''
+    request = rf.patch('/')
+    view = ReservationViewSet(kwargs={'pk': '1'})
+
+    # Separate cache instances on the same directory, as in separate processes
+    first = FileBasedCache(str(tmpdir), {})
+    second = FileBasedCache(str(tmpdir), {})
+
+    assert make_throttle(first, now=10).allow_request(request, view)
+    assert not make_throttle(second, now=20).allow_request(request, view)
+
+    # Rejected requests don't count, and other reservations are unaffected
+    assert not make_throttle(first, now=65).allow_request(request, view)
+    other_view = ReservationViewSet(kwargs={'pk': '2'})
+    assert make_throttle(second, now=65).allow_request(request, other_view)
+
+    # Once the first request is more than a minute old, updates are allowed again
+    assert make_throttle(second, now=80).allow_request(request, view)
+
+
+def test_rate_limit_key_without_query(rf):
+    view = ReservationViewSet(kwargs={'pk': '7'})
+
+    with CaptureQueriesContext(connection) as queries:
+        key = PerReservationRateThrottle().get_cache_key(rf.patch('/'), view)
+
+    assert key == 'throttle_per_reservation_7'
+    assert len(queries) == 0
@@ -0,0 +1,119 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from reservations.models import Destination, Reservation, Room
+from reservations.reports import daily_occupancy_numpy
+from tests.helpers import pin_to_primary
+
+
+@pytest.fixture
+def reservations(customer, destination):
+    rooms = destination.rooms.all()[:3]
+    return [
+        Reservation.objects.create(customer=customer, room=rooms[0], start_date='2018-01-25', end_date='2018-02-02'),
+        Reservation.objects.create(customer=customer, room=rooms[0], start_date='2018-02-04', end_date='2018-02-04'),
+        Reservation.objects.create(customer=customer, room=rooms[1], start_date='2018-02-02', end_date='2018-02-10'),
+        Reservation.objects.create(customer=customer, room=rooms[2], start_date='2018-03-01', end_date='2018-03-02'),
+    ]
+
+
+def get_report(client, destination, start, end):
+    response = client.get(reverse('destination-occupancy', args=[destination.pk]), {'start': start, 'end': end})
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+def test_occupancy_report(client, superuser, destination, reservations):
+    client.force_authenticate(user=superuser)
+
+    report = get_report(client, destination, '2018-02-01', '2018-02-05')
+
+    assert report == {
+        'destination': destination.id,
+        'rooms': 240,
+        'dates': ['2018-02-01', '2018-02-02', '2018-02-03', '2018-02-04', '2018-02-05'],
+        'occupied': [1, 2, 1, 2, 1],
+        'available': [239, 238, 239, 238, 239],
+    }
+
+
+@pytest.mark.django_db
+def test_occupancy_other_destination(customer, destination, reservations):
+    other_destination = Destination.objects.create(
+        name='Other Hotel',
+        address_1='456 Fake St',
+        city='Los Angeles',
+        state='CA',
+        zip='90210'
+    )
+    room = Room.objects.create(number=101, destination=other_destination)
+    Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-01')
+
+    start, end = parse_date('2018-02-01'), parse_date('2018-02-03')
+    assert daily_occupancy_numpy(other_destination.id, start, end) == [1, 0, 0]
+    assert daily_occupancy_numpy(destination.id, start, end) == [1, 2, 1]
+
+
+@pytest.mark.django_db
+def test_occupancy_no_reservations(destination):
+    start = parse_date('2018-02-01')
+    assert daily_occupancy_numpy(destination.id, start, start + datetime.timedelta(days=2)) == [0, 0, 0]
+
+
+@pytest.mark.django_db
+def test_occupancy_report_cached(client, superuser, customer, destination, reservations):
+    client.force_authenticate(user=superuser)
+    get_report(client, destination, '2018-02-01', '2018-02-05')
+
+    with CaptureQueriesContext(connection) as queries:
+        report = get_report(client, destination, '2018-02-01', '2018-02-05')
+    assert not [q for q in queries if 'reservations_reservation' in q['sql']]
+
+    # New reservations invalidate the cached report
+    Reservation.objects.create(
+        customer=customer,
+        room=destination.rooms.all()[5],
+        start_date='2018-02-05',
+        end_date='2018-02-06'
+    )
+    report = get_report(client, destination, '2018-02-01', '2018-02-05')
+    assert report['occupied'] == [1, 2, 1, 2, 2]
+
+
+@pytest.mark.parametrize('params', [
+    {'start': '2018-02-05', 'end': '2018-02-01'},
+    {'start': '2018-01-01', 'end': '2019-01-02'},
+])
+@pytest.mark.django_db
+def test_occupancy_invalid_range(client, superuser, destination, params):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('destination-occupancy', args=[destination.pk]), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_reports_from_lagging_replica_are_not_cached(client, superuser, customer, destination, lagging_replica):
+    client.force_authenticate(user=superuser)
+    lagging_replica()
+    room = destination.rooms.first()
+    Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01', end_date='2018-02-01')
+
+    # Read from the replica, which hasn't seen the reservation yet
+    assert get_report(client, destination, '2018-02-01', '2018-02-01')['occupied'] == [0]
+
+    pin_to_primary(client)
+    assert get_report(client, destination, '2018-02-01', '2018-02-01')['occupied'] == [1]
+
+    # Other clients get the report cached from the primary
+    other_client = APIClient()
+    other_client.force_authenticate(user=superuser)
+    assert get_report(other_client, destination, '2018-02-01', '2018-02-01')['occupied'] == [1]
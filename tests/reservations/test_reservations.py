@@ -1,9 +1,13 @@
 import pytest
+from django.db import connection, IntegrityError
 from django.urls import reverse
 from django.utils.dateparse import parse_date
 from rest_framework import status
 
 from reservations.models import Reservation
+from reservations.serializers import (
+    CONFLICT_MESSAGE, UniqueForDateRangeValidator
+)
 
 # Five dates in order, for testing ranges
 DATES = [
@@ -157,3 +161,39 @@ def test_update_with_conflicting_reservation(client, room, customer, superuser):
     # Verify start date wasn't update
     reservation.refresh_from_db()
     assert reservation.start_date == parse_date(DATES[3])
+
+
+@pytest.mark.django_db
+def test_conflict_from_database_constraint(client, room, customer, other_customer, superuser, monkeypatch):
+    '''
+    A conflict that slips past the validator (e.g. a concurrent request) and is
+    rejected by the database should look the same as a validator conflict
+    '''
+    client.force_authenticate(user=superuser)
+
+    def violate_constraint(self, *args, **kwargs):
+        raise IntegrityError('violates exclusion constraint "{}"'.format(Reservation.OVERLAP_CONSTRAINT))
+
+    monkeypatch.setattr(UniqueForDateRangeValidator, '__call__', lambda self, value: None)
+    monkeypatch.setattr(Reservation, 'save', violate_constraint)
+
+    data = {
+        'customer': other_customer.id,
+        'room': room.id,
+        'start_date': DATES[1],
+        'end_date': DATES[3],
+    }
+    response = client.post(reverse('reservation-list'), data)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {'non_field_errors': [CONFLICT_MESSAGE]}
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='exclusion constraints require PostgreSQL')
+@pytest.mark.django_db
+def test_overlap_constraint(room, customer):
+    Reservation.objects.create(customer=customer, room=room, start_date=DATES[1], end_date=DATES[3])
+
+    # Bypasses the serializer validator entirely
+    with pytest.raises(IntegrityError):
+        Reservation.objects.create(customer=customer, room=room, start_date=DATES[3], end_date=DATES[4])
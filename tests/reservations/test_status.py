@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from reservations.models import Reservation
+
+
+@pytest.fixture
+def reservations(customer, room):
+    '''
+    One checked out, one in-house and one pending reservation (in that order)
+    '''
+    today = timezone.now().date()
+    day = datetime.timedelta(days=1)
+    return [
+        Reservation.objects.create(customer=customer, room=room, start_date=today - 5 * day, end_date=today - day),
+        Reservation.objects.create(customer=customer, room=room, start_date=today, end_date=today + day),
+        Reservation.objects.create(customer=customer, room=room, start_date=today + 2 * day, end_date=today + 3 * day),
+    ]
+
+
+@pytest.mark.django_db
+def test_status_annotation(reservations):
+    today = timezone.now().date()
+
+    annotated = Reservation.objects.with_status(today).order_by('id')
+    assert [reservation.status for reservation in annotated] == ['checked_out', 'in_house', 'pending']
+
+    # Same result as the Python implementation
+    for reservation in annotated:
+        assert reservation.status == Reservation.status_for(reservation.start_date, reservation.end_date, today)
+
+
+@pytest.mark.parametrize('value,index', [
+    ('checked_out', 0),
+    ('in_house', 1),
+    ('pending', 2),
+])
+@pytest.mark.django_db
+def test_filter_by_status(client, superuser, reservations, value, index):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('reservation-list'), {'status': value})
+    assert response.status_code == status.HTTP_200_OK
+
+    assert [reservation['id'] for reservation in response.data['results']] == [reservations[index].id]
+    assert response.data['results'][0]['status'] == value
+
+
+@pytest.mark.django_db
+def test_filter_by_invalid_status(client, superuser, reservations):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('reservation-list'), {'status': 'cancelled'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_order_by_status(client, superuser, reservations):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('reservation-list'), {'ordering': '-status'})
+    assert response.status_code == status.HTTP_200_OK
+
+    statuses = [reservation['status'] for reservation in response.data['results']]
+    assert statuses == ['pending', 'in_house', 'checked_out']
+
+
+@pytest.mark.django_db
+def test_status_after_update(client, superuser, reservations, other_room):
+    client.force_authenticate(user=superuser)
+
+    # Status in the response reflects the updated dates
+    data = {'room': other_room.id, 'start_date': timezone.now().date()}
+    response = client.patch(reverse('reservation-detail', args=[reservations[2].pk]), data)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['status'] == 'in_house'
@@ -0,0 +1,162 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from reservations.archive import archive_reservations
+from reservations.models import Customer, Reservation, Tombstone
+from reservations.sync import prune_tombstones
+
+
+@pytest.fixture(autouse=True)
+def no_sync_lag(settings):
+    settings.SYNC_LAG_SECONDS = 0
+
+
+def sync(client, name, **params):
+    response = client.get(reverse('{}-sync'.format(name)), params)
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+def test_sync_changes_and_deletions(client, superuser, customer, other_customer, room):
+    client.force_authenticate(user=superuser)
+
+    # First sync returns everything
+    data = sync(client, 'customer')
+    assert [item['id'] for item in data['results']] == [customer.id, other_customer.id]
+    assert data['results'][0]['email'] == customer.email
+    assert data['deleted'] == []
+    assert data['more'] is False
+
+    # Nothing changed since
+    cursor = data['cursor']
+    data = sync(client, 'customer', cursor=cursor)
+    assert (data['results'], data['deleted'], data['more']) == ([], [], False)
+
+    new = Customer.objects.create(first_name='Ann', last_name='Lee', phone='555-555-0000', email='ann@example.com')
+    customer.phone = '555-555-9999'
+    customer.save()
+    deleted_id = other_customer.id
+    other_customer.delete()
+
+    data = sync(client, 'customer', cursor=cursor)
+    assert [item['id'] for item in data['results']] == [new.id, customer.id]
+    assert data['results'][1]['phone'] == '555-555-9999'
+    assert data['deleted'] == [deleted_id]
+
+    # Objects deleted along with a customer get tombstones too
+    reservation = Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01',
+                                             end_date='2018-02-03')
+    reservation_id = reservation.id
+    customer.delete()
+    assert Tombstone.objects.filter(model='reservations.reservation', object_id=reservation_id).exists()
+
+
+@pytest.mark.django_db
+def test_sync_pages(client, superuser, customer, room, other_room):
+    client.force_authenticate(user=superuser)
+    reservations = [
+        Reservation.objects.create(customer=customer, room=room, start_date='2018-02-0{}'.format(day),
+                                   end_date='2018-02-0{}'.format(day))
+        for day in range(1, 6)
+    ]
+
+    data = sync(client, 'reservation', page_size=2)
+    ids = [item['id'] for item in data['results']]
+    assert data['results'][0]['status'] == 'checked_out'
+    while data['more']:
+        data = sync(client, 'reservation', page_size=2, cursor=data['cursor'])
+        ids.extend(item['id'] for item in data['results'])
+    assert ids == [reservation.id for reservation in reservations]
+
+    for reservation in reservations[:3]:
+        reservation.delete()
+    data = sync(client, 'reservation', page_size=2, cursor=data['cursor'])
+    assert data['deleted'] == ids[:2]
+    assert data['more'] is True
+    data = sync(client, 'reservation', page_size=2, cursor=data['cursor'])
+    assert data['deleted'] == ids[2:3]
+    assert data['more'] is False
+
+
+@pytest.mark.django_db
+def test_sync_updated_since(client, superuser, room, other_room):
+    client.force_authenticate(user=superuser)
+    since = timezone.now()
+    room.save()
+
+    data = sync(client, 'room', updated_since=since.isoformat())
+    assert [item['id'] for item in data['results']] == [room.id]
+
+
+@pytest.mark.django_db
+def test_sync_lag(client, superuser, customer, settings):
+    client.force_authenticate(user=superuser)
+    settings.SYNC_LAG_SECONDS = 60
+
+    # Changes are only returned once they're old enough to be committed
+    data = sync(client, 'customer')
+    assert data['results'] == []
+
+    Customer.objects.filter(id=customer.id).update(updated_at=timezone.now() - datetime.timedelta(minutes=2))
+    data = sync(client, 'customer', cursor=data['cursor'])
+    assert [item['id'] for item in data['results']] == [customer.id]
+
+
+@pytest.mark.django_db
+def test_archived_reservations_are_deleted(client, superuser, customer, room):
+    client.force_authenticate(user=superuser)
+    reservation = Reservation.objects.create(customer=customer, room=room, start_date='2018-02-01',
+                                             end_date='2018-02-03')
+    cursor = sync(client, 'reservation')['cursor']
+
+    list(archive_reservations(timezone.now().date(), batch_size=100))
+    assert sync(client, 'reservation', cursor=cursor)['deleted'] == [reservation.id]
+
+
+@pytest.mark.django_db
+def test_expired_and_invalid_cursors(client, superuser, customer, settings):
+    client.force_authenticate(user=superuser)
+
+    response = client.get(reverse('customer-sync'), {'cursor': 'abc'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    since = timezone.now() - datetime.timedelta(days=settings.TOMBSTONE_RETENTION_DAYS + 1)
+    response = client.get(reverse('customer-sync'), {'updated_since': since.isoformat()})
+    assert response.status_code == status.HTTP_410_GONE
+
+
+@pytest.mark.django_db
+def test_idle_cursor_does_not_expire(client, superuser, customer, settings, monkeypatch):
+    client.force_authenticate(user=superuser)
+    retention = datetime.timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+    customer_id = customer.id
+    customer.delete()
+    Tombstone.objects.update(deleted_at=timezone.now() - retention + datetime.timedelta(days=1))
+
+    since = timezone.now() - retention + datetime.timedelta(hours=12)
+    data = sync(client, 'customer', updated_since=since.isoformat())
+    assert data['deleted'] == [customer_id]
+    cursor = sync(client, 'customer', cursor=data['cursor'])['cursor']
+
+    # Nothing deleted since, but the cursor has still moved past the tombstone
+    later = timezone.now() + datetime.timedelta(days=2)
+    monkeypatch.setattr(timezone, 'now', lambda: later)
+    assert sync(client, 'customer', cursor=cursor)['deleted'] == []
+
+
+@pytest.mark.django_db
+def test_prune_tombstones(customer, other_customer, settings):
+    old_id, recent_id = customer.id, other_customer.id
+    customer.delete()
+    other_customer.delete()
+    Tombstone.objects.filter(object_id=old_id).update(
+        deleted_at=timezone.now() - datetime.timedelta(days=settings.TOMBSTONE_RETENTION_DAYS + 1)
+    )
+
+    assert prune_tombstones() == 1
+    assert list(Tombstone.objects.values_list('object_id', flat=True)) == [recent_id]